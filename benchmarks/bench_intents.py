@@ -0,0 +1,44 @@
+"""Compare the single-pass IntentMatcher with the sequential REGEXES_MATCH scan.
+
+Run from the repository root: python -m benchmarks.bench_intents
+"""
+
+import re
+import timeit
+
+from benchmarks.corpus import CHAT_LINES
+from wikibot.intents import IntentMatcher
+from wikibot.parser import MessageParser
+
+
+def sequential_matcher():
+    regex_match = [
+        (message_group, re.compile(regex, re.IGNORECASE)) for message_group, regex in MessageParser.REGEXES_MATCH
+    ]
+
+    def match(message):
+        for message_type, pattern in regex_match:
+            if matches := re.findall(pattern, message):
+                return message_type, matches
+        for key, value in MessageParser.CONTAINS.items():
+            if key in message:
+                return value, None
+
+    return match
+
+
+def main(number: int = 2000) -> None:
+    sequential = sequential_matcher()
+    single_pass = IntentMatcher(MessageParser.REGEXES_MATCH, MessageParser.CONTAINS, MessageParser.KEYWORDS).match
+    for line in CHAT_LINES:
+        assert sequential(line) == single_pass(line), line
+    chatter = [line for line in CHAT_LINES if sequential(line) is None]
+    for corpus_name, corpus in [("all lines", CHAT_LINES), ("chatter", chatter)]:
+        for name, match in [("sequential", sequential), ("single pass", single_pass)]:
+            elapsed = timeit.timeit(lambda: [match(line) for line in corpus], number=number)
+            per_message = elapsed / (number * len(corpus)) * 1e6
+            print(f"{corpus_name:>9} {name:>12}: {per_message:.2f} µs/message")
+
+
+if __name__ == "__main__":
+    main()
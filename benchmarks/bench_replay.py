@@ -0,0 +1,103 @@
+"""Per-intent latency and sustained throughput of MessageParser against the replayed wiki APIs.
+
+Run from the repository root: python -m benchmarks.bench_replay [--latency 0.05] [--warm]
+
+Caches are cleared before every timed answer and before every throughput run unless --warm is given.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.corpus import REPLAY_MESSAGES
+from wikibot.config import config
+from wikibot.parser import MessageParser
+from wikibot.replay import Cassette, ReplayServer
+
+CASSETTE = Path(__file__).parent.parent / "tests" / "fixtures" / "replay.jsonl"
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def reset(parser: MessageParser) -> None:
+    parser.wiki_manager.search_cache.clear()
+    parser.wiki_manager.entities.clear()
+    parser.wiki_manager.entity_ids.clear()
+
+
+async def timed_response(parser: MessageParser, message: str, warm: bool) -> float:
+    if not warm:
+        reset(parser)
+    started = time.perf_counter()
+    await parser.get_response(message)
+    return time.perf_counter() - started
+
+
+async def per_intent(parser: MessageParser, rounds: int, warm: bool) -> None:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    for message in REPLAY_MESSAGES:
+        intent = (await parser.get_matches(message))[0].value[0]
+        for _ in range(rounds):
+            latencies[intent].append(await timed_response(parser, message, warm))
+    print(f"{'intent':>14} {'p50 ms':>8} {'p95 ms':>8}")
+    for intent, values in latencies.items():
+        print(f"{intent:>14} {statistics.median(values) * 1000:8.1f} {percentile(values, 0.95) * 1000:8.1f}")
+
+
+async def throughput(parser: MessageParser, concurrency: int, total: int, warm: bool) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def worker(message: str) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await parser.get_response(message)
+            latencies.append(time.perf_counter() - started)
+
+    if not warm:
+        reset(parser)
+    messages = [REPLAY_MESSAGES[index % len(REPLAY_MESSAGES)] for index in range(total)]
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(message) for message in messages))
+    elapsed = time.perf_counter() - started
+    print(
+        f"concurrency {concurrency:>3}: {total / elapsed:8.1f} msgs/sec, "
+        f"p50 {statistics.median(latencies) * 1000:.1f} ms, p99 {percentile(latencies, 0.99) * 1000:.1f} ms"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    server = ReplayServer(Cassette(args.cassette), latency=args.latency, jitter=args.jitter)
+    await server.start()
+    for name, value in server.environment().items():
+        setattr(config, name.lower(), value)
+    config.file_id_cache_path = None
+    parser = MessageParser()
+    try:
+        await per_intent(parser, args.rounds, args.warm)
+        for concurrency in args.concurrency:
+            await throughput(parser, concurrency, args.messages, args.warm)
+    finally:
+        await parser.http_client.aclose()
+        await server.stop()
+    if server.misses:
+        print(f"{server.misses} requests were not in the cassette, record it again with python -m wikibot.replay")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--cassette", default=str(CASSETTE))
+    arg_parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every upstream response")
+    arg_parser.add_argument("--jitter", type=float, default=0.02)
+    arg_parser.add_argument("--rounds", type=int, default=10, help="timed answers per intent")
+    arg_parser.add_argument("--messages", type=int, default=200, help="messages per throughput run")
+    arg_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    arg_parser.add_argument("--warm", action="store_true", help="keep caches between messages")
+    asyncio.run(main(arg_parser.parse_args()))
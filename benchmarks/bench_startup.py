@@ -0,0 +1,56 @@
+"""Time the startup of a fresh process: imports, setup_bot, the background warm-up and a second parser.
+
+Run from the repository root: python -m benchmarks.bench_startup [--runs 5] [--backend async]
+
+The pywikibot backend needs network access to finish its warm-up.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = """
+import asyncio, json, time
+started = time.perf_counter()
+from wikibot.bot import setup_bot
+from wikibot.parser import MessageParser
+timings = {"import": time.perf_counter() - started}
+
+async def main():
+    mark = time.perf_counter()
+    application = await setup_bot()
+    timings["setup_bot"] = time.perf_counter() - mark
+    mark = time.perf_counter()
+    await application.bot_data["message_parser"].wait_ready()
+    timings["warm_up"] = time.perf_counter() - mark
+    mark = time.perf_counter()
+    await MessageParser(http_client=application.bot_data["http_client"]).wait_ready()
+    timings["second_parser"] = time.perf_counter() - mark
+    timings["until_polling"] = timings["import"] + timings["setup_bot"]
+    timings["until_ready"] = timings["until_polling"] + timings["warm_up"]
+
+asyncio.run(main())
+print(json.dumps(timings))
+"""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--backend", default="async", choices=["async", "pywikibot"])
+    args = parser.parse_args()
+    env = {**os.environ, "TELEGRAM_TOKEN": "0:benchmark", "WIKI_BACKEND": args.backend, "FILE_ID_CACHE_PATH": ""}
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True)
+        runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    for phase in runs[0]:
+        values = [run[phase] * 1000 for run in runs]
+        print(f"{phase:>14}: median {statistics.median(values):7.1f} ms, max {max(values):7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
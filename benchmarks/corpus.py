@@ -0,0 +1,52 @@
+CHAT_LINES = [
+    "Привіт усім!",
+    "хто йде сьогодні на каву?",
+    "Я вже на місці, чекаю біля входу",
+    "ахахах, це топ",
+    "Скиньте, будь ласка, посилання на документ",
+    "Хто знає, коли буде наступна зустріч?",
+    "Дякую!",
+    "Ок, зрозумів",
+    "А де ви зараз?",
+    "Сьогодні така погода гарна",
+    "Чи хтось бачив мої ключі?",
+    "Завтра о 10:00 біля метро",
+    "👍",
+    "Нормально, а у тебе як справи?",
+    "Подивіться, що я знайшов: https://example.com/some/long/link?with=query",
+    "Треба купити хліба, молока і яєць",
+    "Що таке Вікіпедія?",
+    "хто такий Тарас Шевченко",
+    "Хто така Леся Українка?",
+    "Пам'ятаєте [[Київ]] і [[Львів]]?",
+    "Коли народився Джордж Буш старший?",
+    "дата народження Івана Франка",
+    "Коли помер Майкл Джексон?",
+    "дата смерті Рейгана",
+    "@ukwikibot сфера роботи Ейнштейна",
+    "Де розташований Київ?",
+    "де знаходиться Говерла",
+    "Координати Львова",
+    "Знайди фото Києва",
+    "покажи зображення Карпат",
+    "Чуєш, @ukwikibot, як ти?",
+    "Ну що таке, знову дощ",
+    "Він такий смішний",
+    "Я там народився, до речі",
+    "Покажи, що там у тебе",
+]
+
+# Messages answered by the recorded cassette in tests/fixtures/replay.jsonl
+REPLAY_MESSAGES = [
+    "Що таке Вікіпедія?",
+    "Хто такий Рональд Рейган?",
+    "Коли народився Рональд Рейган?",
+    "Дата народження джорджа буша старшого",
+    "Коли помер Джордж Буш старший",
+    "Де розташований Київ",
+    "Координати Львова",
+    "Знайди фото Києва",
+    "Покажи фото Рейгана",
+    "Дивись [[Рейган]] і [[oooòoooo]]",
+    "@ukwikibot сфера роботи Рейгана",
+]
@@ -0,0 +1,229 @@
+"""End-to-end load generator for the Telegram handlers.
+
+Synthetic updates are fed into the real parse_messages and parse_command handlers, the way the
+Application runs them with block=False, against a stubbed wiki backend and a fake Bot that records
+replies after a simulated send latency.
+
+Run from the repository root: python -m benchmarks.load [--updates 2000] [--rate 200] [--blocking] [--telegram-limits]
+"""
+
+import argparse
+import asyncio
+import random
+import resource
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple
+
+from httpx import AsyncClient, MockTransport, Request, Response
+from telegram import Chat, Message, Update, User
+
+from benchmarks.corpus import CHAT_LINES
+from wikibot.api import WikiPage
+from wikibot.bot import parse_command, parse_messages
+from wikibot.config import config
+from wikibot.intents import IntentMatcher
+from wikibot.outbox import Outbox
+from wikibot.parser import MessageParser
+from wikibot.wiki import BaseWikiManager
+
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 2048 + b"\xff\xd9"
+COMMANDS = ["/help", "/random", "/wiki", "/start"]
+LINK_TITLES = ["Київ", "Львів", "Одеса", "Харків", "Дніпро", "Тарас Шевченко", "Леся Українка", "oooòoooo"]
+
+
+async def jittered_sleep(latency: float) -> None:
+    if latency:
+        await asyncio.sleep(random.uniform(0.5 * latency, 1.5 * latency))
+
+
+class StubWikiManager(BaseWikiManager):
+    """Answers every lookup with made up data after ``latency`` seconds, queries with "ooo" are not found."""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+
+    def make_indexed_page(self, title: str, qid: str | None, extract: str | None) -> WikiPage:
+        return WikiPage(title, qid=qid, extract=extract)
+
+    async def fetch_search_page(self, query: str) -> WikiPage | None:
+        await jittered_sleep(self.latency)
+        if "ooo" in query.lower():
+            return None
+        title = query.strip(" ?").title()
+        return WikiPage(title, qid=f"Q{abs(hash(title)) % 10**6}", extract=f"{title} — стаття про {query}.")
+
+    async def fetch_plain_text(self, page: WikiPage, fresh: bool = False) -> str | None:
+        await jittered_sleep(self.latency)
+        return page.extract
+
+    async def get_random_page(self) -> WikiPage | None:
+        return await self.fetch_search_page(random.choice(LINK_TITLES[:-1]))
+
+    async def fetch_random_pages(self, count: int) -> List[WikiPage]:
+        await jittered_sleep(self.latency)
+        titles = random.choices(LINK_TITLES[:-1], k=count)
+        return [WikiPage(title, extract=f"{title} — випадкова стаття.") for title in titles]
+
+    async def fetch_gender(self, page: WikiPage) -> str:
+        await jittered_sleep(self.latency)
+        return "female" if hash(page.title()) % 2 else "male"
+
+    async def fetch_coords(self, page: WikiPage) -> Tuple[float, float] | None:
+        await jittered_sleep(self.latency)
+        return 50.45, 30.52
+
+    async def fetch_wikidata_date(self, page: WikiPage, prop) -> str | None:
+        await jittered_sleep(self.latency)
+        return "6 лютого 1911"
+
+    async def fetch_wikidata_text(self, page: WikiPage, prop) -> List[str]:
+        await jittered_sleep(self.latency)
+        return ["фізика", "математика"][: hash(page.title()) % 3]
+
+    async def get_page_image_info(self, page: WikiPage) -> Tuple[str | None, str | None, str | None]:
+        await jittered_sleep(self.latency)
+        return f"https://upload.example.org/{page.qid}.jpg", f"https://commons.example.org/{page.qid}", "Kyiv"
+
+
+class FakeBot:
+    """Stands in for telegram.Bot, every send waits ``latency`` seconds and is counted."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.sent: Dict[str, int] = {"text": 0, "location": 0, "photo": 0, "media_group": 0}
+        self.file_ids = 0
+
+    async def _send(self, kind: str) -> SimpleNamespace:
+        await jittered_sleep(self.latency)
+        self.sent[kind] += 1
+        self.file_ids += 1
+        return SimpleNamespace(photo=[SimpleNamespace(file_id=f"file-{self.file_ids}")])
+
+    async def send_message(self, **_: Any) -> SimpleNamespace:
+        return await self._send("text")
+
+    async def send_location(self, **_: Any) -> SimpleNamespace:
+        return await self._send("location")
+
+    async def send_photo(self, **_: Any) -> SimpleNamespace:
+        return await self._send("photo")
+
+    async def send_media_group(self, media: List[Any], **_: Any) -> List[SimpleNamespace]:
+        message = await self._send("media_group")
+        return [message] * len(media)
+
+
+def make_http_client(latency: float) -> AsyncClient:
+    async def handler(request: Request) -> Response:
+        await jittered_sleep(latency)
+        if "ooo" in request.url.path:
+            return Response(404)
+        if request.url.host == "upload.example.org":
+            return Response(200, content=JPEG, headers={"content-type": "image/jpeg"})
+        return Response(200, text="<html></html>", headers={"content-type": "text/html"})
+
+    return AsyncClient(transport=MockTransport(handler))
+
+
+def generate_messages(count: int, rng: random.Random, burst: int) -> List[str]:
+    """Mix intents, chatter, commands, link-heavy messages and bursts of the same message."""
+    matcher = IntentMatcher(MessageParser.REGEXES_MATCH, MessageParser.CONTAINS, MessageParser.KEYWORDS)
+    intents = [line for line in CHAT_LINES if matcher.match(line)]
+    chatter = [line for line in CHAT_LINES if not matcher.match(line)]
+    messages = []
+    while len(messages) < count:
+        kind = rng.choices(["intent", "chatter", "command", "links", "burst"], weights=[40, 40, 5, 10, 5])[0]
+        if kind == "intent":
+            messages.append(rng.choice(intents))
+        elif kind == "chatter":
+            messages.append(rng.choice(chatter))
+        elif kind == "command":
+            messages.append(rng.choice(COMMANDS))
+        elif kind == "links":
+            messages.append(" і ".join(f"[[{title}]]" for title in rng.sample(LINK_TITLES, rng.randint(3, 6))))
+        else:
+            messages.extend([rng.choice(intents)] * burst)
+    return messages[:count]
+
+
+def make_update(update_id: int, text: str, bot: FakeBot) -> Update:
+    chat = Chat(id=-1000 - update_id % 50, type=Chat.SUPERGROUP)
+    user = User(id=update_id % 500, first_name="Тест", is_bot=False)
+    message = Message(update_id, datetime.now(timezone.utc), chat, from_user=user, text=text)
+    message.set_bot(bot)
+    return Update(update_id, message=message)
+
+
+async def handle(parser: MessageParser, outbox: Outbox, update: Update, arrived: float, latencies: List[float]) -> None:
+    text = update.message.text
+    if text.startswith("/") and text.lstrip("/") in MessageParser.COMMANDS:
+        await parse_command(parser, outbox, update, None)
+    else:
+        await parse_messages(parser, outbox, update, None)
+    latencies.append(time.perf_counter() - arrived)
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run(args: argparse.Namespace) -> None:
+    config.file_id_cache_path = None
+    if not args.telegram_limits:
+        # Measure the bot rather than Telegram's flood limits, replies are still queued and merged
+        config.telegram_global_rate = config.telegram_chat_rate = config.telegram_group_rate = 1e9
+    bot = FakeBot(args.send_latency)
+    parser = MessageParser(
+        http_client=make_http_client(args.wiki_latency), wiki_manager=StubWikiManager(args.wiki_latency)
+    )
+    outbox = Outbox(parser.file_ids, parser.download_image)
+    updates = [
+        make_update(index, text, bot)
+        for index, text in enumerate(generate_messages(args.updates, random.Random(args.seed), args.burst))
+    ]
+    latencies: List[float] = []
+    tasks = []
+    if args.tracemalloc:
+        tracemalloc.start()
+    started = time.perf_counter()
+    for index, update in enumerate(updates):
+        # Latency counts from the moment an update is due, so time spent queued behind blocking handlers is included
+        arrived = started + index / args.rate if args.rate else started
+        await asyncio.sleep(max(0.0, arrived - time.perf_counter()))
+        if args.blocking:
+            await handle(parser, outbox, update, arrived, latencies)
+        else:
+            tasks.append(asyncio.create_task(handle(parser, outbox, update, arrived, latencies)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    await parser.http_client.aclose()
+
+    print(f"{len(updates)} updates in {elapsed:.2f}s: {len(updates) / elapsed:.1f} msgs/sec")
+    print(
+        f"latency p50 {statistics.median(latencies) * 1000:.1f} ms, p95 {percentile(latencies, 0.95) * 1000:.1f} ms, "
+        f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms, max {max(latencies) * 1000:.1f} ms"
+    )
+    print("replies: " + ", ".join(f"{kind} {count}" for kind, count in bot.sent.items()))
+    print(f"max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+    if args.tracemalloc:
+        print(f"traced Python memory peak {tracemalloc.get_traced_memory()[1] / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--updates", type=int, default=2000)
+    arg_parser.add_argument("--rate", type=float, default=0, help="updates per second, 0 sends them all at once")
+    arg_parser.add_argument("--burst", type=int, default=20, help="copies of a message in a burst of duplicates")
+    arg_parser.add_argument("--wiki-latency", type=float, default=0.05, help="seconds per stubbed wiki call")
+    arg_parser.add_argument("--send-latency", type=float, default=0.03, help="seconds per Telegram send")
+    arg_parser.add_argument("--blocking", action="store_true", help="handle updates one by one, like block=True")
+    arg_parser.add_argument("--telegram-limits", action="store_true", help="keep Telegram's rate limits")
+    arg_parser.add_argument("--tracemalloc", action="store_true", help="also report the traced Python memory peak")
+    arg_parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(run(arg_parser.parse_args()))
@@ -5,7 +5,13 @@ import logging.config
 import yaml
 from telegram.ext import Application
 
-from wikibot.bot import setup_bot
+from wikibot.bot import setup_bot, setup_front
+from wikibot.config import config
+from wikibot.metrics import QUEUE_DEPTH, registry
+from wikibot.recent_changes import RecentChangesFeed, log_stopped
+from wikibot.server import HttpServer
+from wikibot.webhook import WebhookServer
+from wikibot.workers import Router, WorkersFailed, forward_updates
 
 
 def setup_logging() -> None:
@@ -14,26 +20,108 @@ def setup_logging() -> None:
         logging.config.dictConfig(config)
 
 
+async def start_metrics(application: Application) -> None:
+    if not config.metrics_port:
+        return
+    if parser := application.bot_data.get("message_parser"):
+        registry.add_collector(parser.collect_metrics)
+    registry.add_collector(lambda: QUEUE_DEPTH.set(application.update_queue.qsize(), queue="updates"))
+    if outbox := application.bot_data.get("outbox"):
+        registry.add_collector(lambda: QUEUE_DEPTH.set(outbox.pending, queue="outbox"))
+    server = HttpServer(config.metrics_listen, config.metrics_port)
+    server.route("GET", "/metrics", registry.handle)
+    application.bot_data["metrics"] = server
+    await server.start()
+
+
+def start_parser(application: Application) -> None:
+    if parser := application.bot_data.get("message_parser"):
+        # Updates that arrive before the warm-up finishes wait at the parser's readiness gate
+        parser.start_warm_up()
+        if parser.wiki_manager.random_pool is not None:
+            parser.wiki_manager.random_pool.start_refill()
+        if config.recent_changes_url:
+            feed = RecentChangesFeed(parser.wiki_manager, config.recent_changes_url, parser.http_client)
+            application.bot_data["recent_changes"] = asyncio.ensure_future(feed.run())
+            application.bot_data["recent_changes"].add_done_callback(log_stopped)
+
+
 async def start(application: Application) -> Application:
     await application.initialize()
-    await application.updater.start_polling()
-    await application.start()
+    start_parser(application)
+    if router := application.bot_data.get("router"):
+        router.start()
+    await start_metrics(application)
+    if config.telegram_mode == "webhook":
+        webhook = WebhookServer(
+            application,
+            config.webhook_listen,
+            config.webhook_port,
+            config.webhook_path,
+            config.webhook_secret_token,
+        )
+        application.bot_data["webhook"] = webhook
+        await application.start()
+        await webhook.start()
+    else:
+        await application.updater.start_polling()
+        await application.start()
     return application
 
 
 async def stop(application: Application) -> None:
-    await application.updater.stop()
-    await application.stop()
+    if webhook := application.bot_data.get("webhook"):
+        await webhook.stop()
+    if metrics := application.bot_data.get("metrics"):
+        await metrics.stop()
+    if recent_changes := application.bot_data.get("recent_changes"):
+        recent_changes.cancel()
+    if application.updater and application.updater.running:
+        await application.updater.stop()
+    if router := application.bot_data.get("router"):
+        await router.stop(config.webhook_drain_timeout)
+    if application.running:
+        await application.stop()
     await application.shutdown()
+    if http_client := application.bot_data.get("http_client"):
+        await http_client.aclose()
+
+
+def run_worker(index: int, queue) -> None:
+    """Entry point of a worker process of the sharded mode, each one serves its own metrics port."""
+    setup_logging()
+    if config.metrics_port:
+        config.metrics_port += index + 1
+    asyncio.run(serve_worker(queue))
+
+
+async def serve_worker(queue) -> None:
+    application = await setup_bot(updater=False)
+    try:
+        await application.initialize()
+        start_parser(application)
+        await start_metrics(application)
+        await application.start()
+        await forward_updates(application, queue)
+    except Exception:  # noqa
+        logging.exception("Worker failed")
+    finally:
+        await stop(application)
 
 
 async def run_polling() -> None:
-    application = await setup_bot()
+    router = Router(config.workers, run_worker, max_restarts=config.worker_max_restarts) if config.workers > 1 else None
+    application = await (setup_front(router) if router is not None else setup_bot())
     try:
         application = await start(application)
         while application.running:
             await asyncio.sleep(5)
+            if router is not None:
+                router.check()
         logging.error("Unexpected stopping the bot")
+    except WorkersFailed:
+        # Exit with an error, so whatever runs the bot can restart it as a whole
+        raise
     except Exception:  # noqa
         logging.exception("Cannot run the bot")
     finally:
@@ -42,4 +130,5 @@ async def run_polling() -> None:
 
 if __name__ == "__main__":
     setup_logging()
+    config.validate()
     asyncio.run(run_polling())
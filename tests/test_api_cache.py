@@ -0,0 +1,150 @@
+import pywikibot.data.api
+import pywikibot.site
+from pywikibot.login import LoginStatus
+
+from wikibot.api_cache import ResponseCache, api_modules, parse_ttls, request_key
+from wikibot.wiki import PersistentRequestMixin, install_response_cache, persistent_request_class
+
+EXTRACT = {"query": {"pages": {"1": {"pageid": 1, "title": "Київ", "extract": "Київ — столиця України." * 20}}}}
+
+
+def test_modules_and_ttls():
+    assert api_modules({"action": "query", "generator": "search", "prop": "info|extracts"}) == [
+        "query+extracts",
+        "query+info",
+        "query+search",
+    ]
+    assert api_modules({"action": "wbgetentities", "ids": "Q1899"}) == ["wbgetentities"]
+    assert api_modules({"action": "query", "titles": "Київ"}) == ["query"]
+    ttls = parse_ttls("query+search=600, query+extracts=3600,wbgetentities=21600,")
+    cache = ResponseCache(":memory:", ttls=ttls)
+    assert cache.ttl(["query+extracts", "query+search"]) == 600
+    assert cache.ttl(["query+random"]) == 0
+    assert cache.ttl(["query+siteinfo"], default=86400) == 86400
+    params = {"action": "query", "titles": "Київ", "maxlag": "5"}
+    assert request_key("wikipedia:uk", params) == request_key("wikipedia:uk", {**params, "maxlag": "10"})
+    assert request_key("wikipedia:uk", params) != request_key("wikidata:wikidata", params)
+
+
+def test_response_cache_survives_restart(tmp_path):
+    path = str(tmp_path / "api_cache.sqlite3")
+    cache = ResponseCache(path)
+    assert cache.get("a") is None
+    cache.set("a", "query+extracts", EXTRACT, ttl=60)
+    cache.set("b", "query+search", {"query": {}}, ttl=-1)
+    cache.close()
+    cache = ResponseCache(path)
+    response, created = cache.get("a")
+    assert response == EXTRACT and created > 0
+    assert cache.get("b") is None
+    assert cache.stats().hits == 1 and cache.stats().misses == 1
+    assert [row[:2] + row[3:] for row in cache.endpoints()] == [("query+extracts", 1, 0, 1), ("query+search", 1, 1, 0)]
+
+
+def test_response_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / "api_cache.sqlite3"))
+    cache.set("probe", "query+extracts", EXTRACT, ttl=60)
+    size = cache.endpoints()[0][2]
+    cache.max_bytes = size * 3 + size // 2
+    for key in "abc":
+        cache.set(key, "query+extracts", EXTRACT, ttl=60)
+    assert cache.get("probe") is None
+    assert cache.get("a") is not None
+    cache.set("d", "query+extracts", EXTRACT, ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("d") is not None
+    assert cache.stats().evictions >= 2
+
+
+def test_response_cache_keeps_its_total_size(tmp_path):
+    path = str(tmp_path / "api_cache.sqlite3")
+    cache = ResponseCache(path)
+    other = ResponseCache(path)
+
+    def total():
+        return cache.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    cache.set("a", "query+extracts", EXTRACT, ttl=60)
+    cache.set("a", "query+extracts", {"query": {}}, ttl=60)
+    other.set("b", "query+search", EXTRACT, ttl=-1)
+    assert cache._size() == other._size() == total() > 0
+    cache.compact()
+    assert cache.drop("query+extracts") == 1
+    assert cache._size() == total() == 0
+
+
+def test_response_cache_compact_and_drop(tmp_path):
+    cache = ResponseCache(str(tmp_path / "api_cache.sqlite3"))
+    for index in range(200):
+        cache.set(f"old{index}", "query+extracts", EXTRACT, ttl=-1)
+    cache.set("search", "query+search", {"query": {"search": []}}, ttl=60)
+    cache.set("entity", "wbgetentities", {"entities": {}}, ttl=60)
+    removed, before, after = cache.compact()
+    assert removed == 200
+    assert after < before
+    assert cache.drop("query+search") == 1
+    assert [row[0] for row in cache.endpoints()] == ["wbgetentities"]
+
+
+class FakeSite:
+    """Enough of an APISite to build requests without talking to the wiki."""
+
+    _loginstatus = LoginStatus.NOT_LOGGED_IN
+
+    def has_extension(self, name):
+        return False
+
+    def encoding(self):
+        return "utf-8"
+
+    def username(self):
+        return None
+
+    def __repr__(self):
+        return "APISite('uk', 'wikipedia')"
+
+
+def test_pywikibot_requests_go_through_the_cache(tmp_path, monkeypatch):
+    calls = []
+
+    def submit(request):
+        calls.append(request.cache_entry()[1])
+        return EXTRACT
+
+    monkeypatch.setattr(pywikibot.data.api.Request, "submit", submit)
+    monkeypatch.setattr(PersistentRequestMixin, "cache", None)
+    monkeypatch.setattr(pywikibot.site.APISite, "_request_class", pywikibot.site.APISite.__dict__["_request_class"])
+    cache = ResponseCache(str(tmp_path / "api_cache.sqlite3"), ttls={"query+search": 600, "query+extracts": 600})
+    install_response_cache(cache)
+    site = FakeSite()
+    search = {"action": "query", "generator": "search", "gsrsearch": "Київ", "prop": "extracts"}
+    for _ in range(2):
+        request = persistent_request_class({})(site=site, parameters=search)
+        assert request.submit() == EXTRACT
+    assert request.cache_entry()[1:] == ("query+extracts|query+search", 600)
+    for _ in range(2):
+        persistent_request_class({})(site=site, parameters={"action": "query", "list": "random"}).submit()
+        persistent_request_class({})(site=site, parameters={"action": "query", "meta": "userinfo"}).submit()
+    assert calls == ["query+extracts|query+search"] + ["query+random", "query+userinfo"] * 2
+
+
+def test_refresh_skips_the_cached_response(tmp_path, monkeypatch):
+    revisions = iter(["Київ, редакція 1.", "Київ, редакція 2."])
+
+    def submit(request):
+        return {"query": {"pages": {"1": {"pageid": 1, "title": "Київ", "extract": next(revisions)}}}}
+
+    monkeypatch.setattr(pywikibot.data.api.Request, "submit", submit)
+    monkeypatch.setattr(PersistentRequestMixin, "cache", None)
+    monkeypatch.setattr(pywikibot.site.APISite, "_request_class", pywikibot.site.APISite.__dict__["_request_class"])
+    install_response_cache(ResponseCache(str(tmp_path / "api_cache.sqlite3"), ttls={"query+extracts": 3600}))
+    params = {"action": "query", "prop": "extracts", "titles": "Київ"}
+
+    def extract(refresh=False):
+        request = persistent_request_class({})(site=FakeSite(), parameters=params)
+        request.refresh = refresh
+        return request.submit()["query"]["pages"]["1"]["extract"]
+
+    assert extract() == extract() == "Київ, редакція 1."
+    assert extract(refresh=True) == "Київ, редакція 2."
+    assert extract() == "Київ, редакція 2."
@@ -0,0 +1,114 @@
+import asyncio
+
+from httpx import AsyncClient, MockTransport, Response
+
+from wikibot.api import WikiApiClient
+from wikibot.wiki import AsyncWikiManager
+
+REAGAN_CLAIMS = {
+    "P21": [{"mainsnak": {"datavalue": {"value": {"id": "Q6581097"}}}}],
+    "P569": [
+        {
+            "mainsnak": {
+                "datavalue": {
+                    "value": {
+                        "time": "+1911-02-06T00:00:00Z",
+                        "calendarmodel": "http://www.wikidata.org/entity/Q1985727",
+                    }
+                }
+            }
+        }
+    ],
+    "P625": [{"mainsnak": {"datavalue": {"value": {"latitude": 50.45, "longitude": 30.52}}}}],
+}
+
+
+def make_manager(requests):
+    def handler(request):
+        params = dict(request.url.params)
+        requests.append(params)
+        if params.get("generator") == "search" and "ooo" in params["gsrsearch"].lower():
+            return Response(200, json={"batchcomplete": True})
+        if params.get("generator") == "search":
+            page = {
+                "title": "Рональд Рейган",
+                "pageid": 1,
+                "lastrevid": 100,
+                "pageprops": {"wikibase_item": "Q9960"},
+                "extract": "Рональд Рейган — 40-й президент США.\n== Життєпис ==",
+            }
+            return Response(200, json={"query": {"pages": [page]}})
+        if params.get("prop") == "extracts":
+            page = {"title": params["titles"], "extract": f"{params['titles']} — оновлений вступ."}
+            return Response(200, json={"query": {"pages": [page]}})
+        if params.get("action") == "wbgetentities":
+            return Response(200, json={"entities": {"Q9960": {"id": "Q9960", "claims": REAGAN_CLAIMS}}})
+        return Response(200, json={"error": {"code": "badvalue"}})
+
+    return AsyncWikiManager(WikiApiClient(AsyncClient(transport=MockTransport(handler))))
+
+
+async def test_async_search_and_entity():
+    requests = []
+    manager = make_manager(requests)
+    page = await manager.search_page("Рейган")
+    assert str(page) == "[[uk:Рональд Рейган]]"
+    assert await manager.get_gender(page) == "male"
+    assert await manager.get_birthday(page) == "6 лютого 1911"
+    assert await manager.get_deathday(page) is None
+    assert await manager.get_coords(page) == (50.45, 30.52)
+    assert [r["action"] for r in requests] == ["query", "wbgetentities"]
+
+
+async def test_lookup_two_round_trips():
+    requests = []
+    manager = make_manager(requests)
+    [page] = await manager.lookup(["Рейган"])
+    assert page.qid == "Q9960"
+    assert await manager.get_birthday(page) == "6 лютого 1911"
+    assert await manager.get_gender(page) == "male"
+    summary = await manager.get_page_summary(page)
+    assert summary.startswith("Рональд Рейган — 40-й президент США.\n<b>Життєпис </b>")
+    assert "https://uk.wikipedia.org/wiki/Рональд_Рейган" in summary
+    assert [(r["action"], r.get("ids")) for r in requests] == [("query", None), ("wbgetentities", "Q9960")]
+
+
+async def test_search_cache():
+    requests = []
+    manager = make_manager(requests)
+    page = await manager.search_page("Рейган?")
+    assert await manager.search_page("  рейган ") is page
+    assert manager.normalise_query("Мар’янівка, Київ!") == "мар'янівка київ"
+    assert await manager.search_page("oooòoooo") is None
+    assert await manager.search_page("Oooòoooo?") is None
+    assert len(requests) == 2
+
+
+async def test_burst_is_coalesced():
+    requests = []
+    manager = make_manager(requests)
+    pages = await asyncio.gather(*(manager.lookup([query]) for query in ["Рейган", "рейган?", "РЕЙГАН"] * 5))
+    assert {page.qid for [page] in pages} == {"Q9960"}
+    assert [r["action"] for r in requests] == ["query", "wbgetentities"]
+    assert manager.single_flight.stats()["coalesced"] > 0
+
+
+async def test_random_summaries_come_in_batches():
+    requests = []
+
+    def handler(request):
+        params = dict(request.url.params)
+        requests.append(params)
+        pages = [
+            {"title": f"Стаття {i}", "pageid": i, "lastrevid": 10 + i, "extract": f"Стаття {i} — вступ."}
+            for i in range(int(params["grnlimit"]))
+        ]
+        return Response(200, json={"query": {"pages": pages}})
+
+    manager = AsyncWikiManager(WikiApiClient(AsyncClient(transport=MockTransport(handler))))
+    summaries = [await manager.random() for _ in range(5)]
+    assert summaries[0].startswith("Стаття 0 — вступ.")
+    assert len(set(summaries)) == 5
+    assert requests[0]["generator"] == "random" and requests[0]["exintro"] == "1"
+    assert len(requests) <= 2
+    assert len(manager.summaries) == 0
@@ -0,0 +1,34 @@
+from wikibot.cache import MISSING, TTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=None)
+    cache.set("Q1", 1)
+    cache.set("Q2", 2)
+    assert cache.get("Q1") == 1
+    cache.set("Q3", 3)
+    assert cache.get("Q2") is MISSING
+    assert cache.get("Q1") == 1 and cache.get("Q3") == 3
+    assert cache.stats().evictions == 1
+
+
+def test_ttl_expiration():
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=10, ttl=60, timer=timer)
+    cache.set("Київ", "Q1899")
+    cache.set("Львів", "Q36036", ttl=5)
+    timer.now = 10
+    assert cache.get("Київ") == "Q1899"
+    assert cache.get("Львів") is MISSING
+    timer.now = 61
+    assert "Київ" not in cache
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.expirations) == (1, 1, 1)
@@ -0,0 +1,166 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from wikibot.concurrency import (
+    AdaptiveLimiter,
+    ExecutorQueue,
+    FanOut,
+    Overloaded,
+    RefillPool,
+    SingleFlight,
+    TokenBucket,
+)
+
+
+async def test_fan_out_keeps_order_and_limits():
+    fan_out = FanOut(per_call=2, total=10)
+    running = {"current": 0, "max": 0}
+
+    async def work(delay):
+        running["current"] += 1
+        running["max"] = max(running["max"], running["current"])
+        await asyncio.sleep(delay)
+        running["current"] -= 1
+        return delay
+
+    delays = [0.03, 0.01, 0.02, 0.0, 0.01]
+    assert await fan_out.gather(work, delays) == delays
+    assert running["max"] == 2
+
+
+async def test_fan_out_global_limit():
+    fan_out = FanOut(per_call=5, total=3)
+    running = {"current": 0, "max": 0}
+
+    async def work(item):
+        running["current"] += 1
+        running["max"] = max(running["max"], running["current"])
+        await asyncio.sleep(0.01)
+        running["current"] -= 1
+        return item
+
+    results = await asyncio.gather(fan_out.gather(work, range(5)), fan_out.gather(work, range(5)))
+    assert results == [list(range(5)), list(range(5))]
+    assert running["max"] == 3
+
+
+async def test_fan_out_item_timeout_and_failure():
+    fan_out = FanOut(per_call=3, total=10, timeout=0.05)
+
+    async def work(delay):
+        if delay < 0:
+            raise KeyError(delay)
+        await asyncio.sleep(delay)
+        return delay
+
+    results = []
+    async for result in fan_out.map(work, [0.01, 1, -1, 0.02]):
+        results.append(result)
+    assert results == [0.01, None, None, 0.02]
+    assert fan_out.waiting == fan_out.running == 0
+
+
+async def test_single_flight_coalesces():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "Q1899"
+
+    results = await asyncio.gather(*(flight.do("київ", fetch) for _ in range(10)))
+    assert results == ["Q1899"] * 10
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 9}
+    assert await flight.do("київ", fetch) == "Q1899"
+    assert len(calls) == 2
+
+
+async def test_executor_queue_counts_waiting_calls():
+    executor = ExecutorQueue(ThreadPoolExecutor(max_workers=1))
+    release = threading.Event()
+    first = asyncio.ensure_future(executor.run(release.wait))
+    second = asyncio.ensure_future(executor.run(lambda: "Q1899"))
+    await asyncio.sleep(0.05)
+    assert (executor.queued, executor.running) == (1, 1)
+    release.set()
+    assert await asyncio.gather(first, second) == [True, "Q1899"]
+    assert (executor.queued, executor.running) == (0, 0)
+
+
+async def test_adaptive_limiter_halves_once_per_round_and_grows_back():
+    now = [0.0]
+    limiter = AdaptiveLimiter(maximum=8, timer=lambda: now[0])
+    starts = [await limiter.acquire() for _ in range(8)]
+    now[0] = 1.0
+    for started in starts:
+        limiter.on_congestion(started)
+        limiter.release()
+    assert limiter.limit == 4
+    assert limiter.decreases == 1
+
+    for _ in range(40):
+        await limiter.acquire()
+        limiter.on_success()
+        limiter.release()
+    assert limiter.limit == 8
+
+
+async def test_adaptive_limiter_queues_and_pauses():
+    limiter = AdaptiveLimiter(maximum=1)
+    started = await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.stats()["waiting"] == 1
+
+    limiter.on_congestion(started, retry_after=0.05)
+    limiter.release()
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+    await asyncio.wait_for(waiter, 1)
+    assert limiter.in_flight == 1
+
+
+async def test_refill_pool_serves_from_memory():
+    batches = []
+
+    async def fetch():
+        batches.append(len(batches))
+        return [f"{len(batches)}-{i}" for i in range(4)]
+
+    pool = RefillPool(fetch, low=3, high=8)
+    assert await pool.get() == "1-0"
+    assert pool.waits == 1
+    await pool.start_refill()
+    assert len(pool) == 11 and len(batches) == 3
+    assert [await pool.get() for _ in range(9)][-1] == "3-1"
+    assert pool.waits == 1
+    await pool.start_refill()
+    assert len(pool) == 10 and pool.batches == 5
+
+
+async def test_bounded_executor_queue_refuses_when_full():
+    executor = ExecutorQueue.bounded("test", workers=1, max_queue=1)
+    release = threading.Event()
+    running = asyncio.ensure_future(executor.run(release.wait))
+    waiting = asyncio.ensure_future(executor.run(lambda: "Q1899"))
+    await asyncio.sleep(0.05)
+    assert executor.pressure == 1
+    with pytest.raises(Overloaded):
+        await executor.run(lambda: "Q9960")
+    release.set()
+    assert await waiting == "Q1899" and await running
+    assert (executor.rejected, executor.pressure) == (1, 0)
+
+
+async def test_token_bucket_spaces_out_calls():
+    now = [0.0]
+    bucket = TokenBucket(rate=2, burst=2, timer=lambda: now[0])
+    assert await bucket.acquire() == 0 and await bucket.acquire() == 0
+    assert bucket._reserve(1) == 0.5
+    now[0] = 1.0
+    assert await bucket.acquire(5) == 0
@@ -0,0 +1,56 @@
+import asyncio
+
+from httpx import AsyncClient, MockTransport, Response
+
+from wikibot.http_client import HostLimitedTransport
+
+
+async def test_host_limited_transport():
+    in_flight = {"current": 0, "max": 0}
+
+    async def handler(request):
+        in_flight["current"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["current"])
+        await asyncio.sleep(0.01)
+        in_flight["current"] -= 1
+        return Response(200, content=b"ok")
+
+    transport = HostLimitedTransport(MockTransport(handler), max_per_host=2)
+    async with AsyncClient(transport=transport) as client:
+        responses = await asyncio.gather(*(client.get("https://uk.wikipedia.org/") for _ in range(6)))
+    assert all(response.content == b"ok" for response in responses)
+    assert in_flight["max"] == 2
+    assert transport.limiters["uk.wikipedia.org"].in_flight == 0
+
+
+async def test_host_limited_transport_backs_off_and_retries():
+    answers = [
+        Response(429, headers={"retry-after": "0.05"}),
+        Response(200, headers={"mediawiki-api-error": "maxlag", "retry-after": "0"}),
+        Response(200, content=b"ok"),
+    ]
+
+    async def handler(request):
+        return answers.pop(0)
+
+    transport = HostLimitedTransport(MockTransport(handler), max_per_host=8, retries=2)
+    async with AsyncClient(transport=transport) as client:
+        started = asyncio.get_running_loop().time()
+        response = await client.get("https://uk.wikipedia.org/w/api.php")
+        waited = asyncio.get_running_loop().time() - started
+    assert response.content == b"ok"
+    assert waited >= 0.05
+    limiter = transport.limiters["uk.wikipedia.org"]
+    assert limiter.in_flight == 0
+    assert limiter.limit < 8
+
+
+async def test_host_limited_transport_gives_up_after_retries():
+    async def handler(request):
+        return Response(503, headers={"retry-after": "0"})
+
+    transport = HostLimitedTransport(MockTransport(handler), max_per_host=4, retries=1)
+    async with AsyncClient(transport=transport) as client:
+        response = await client.get("https://uk.wikipedia.org/")
+    assert response.status_code == 503
+    assert transport.limiters["uk.wikipedia.org"].in_flight == 0
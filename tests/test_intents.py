@@ -0,0 +1,22 @@
+import re
+
+from benchmarks.corpus import CHAT_LINES
+from wikibot.intents import IntentMatcher
+from wikibot.parser import MessageParser, Messages
+
+
+def sequential_match(message):
+    for message_type, regex in MessageParser.REGEXES_MATCH:
+        if matches := re.findall(regex, message, re.IGNORECASE):
+            return message_type, matches
+    for key, value in MessageParser.CONTAINS.items():
+        if key in message:
+            return value, None
+
+
+def test_intent_matcher_keeps_priority():
+    matcher = IntentMatcher(MessageParser.REGEXES_MATCH, MessageParser.CONTAINS, MessageParser.KEYWORDS)
+    for line in CHAT_LINES + ["Де розташований [[Київ]]?", "@ukwikibot спеціалізація Ейнштейна"]:
+        assert matcher.match(line) == sequential_match(line), line
+    assert matcher.match("де розташований [[Київ]]") == (Messages.LINK, ["Київ"])
+    assert matcher.match("Привіт усім!") is None
@@ -0,0 +1,49 @@
+from pathlib import Path
+
+from tests.test_async_wiki import make_manager
+from wikibot.local_index import LocalIndex, LocalIndexBuilder, iter_abstracts, iter_wikidata_entities
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def build_index(path):
+    builder = LocalIndexBuilder(str(path))
+    assert builder.add_wikidata(iter_wikidata_entities(str(FIXTURES / "wikidata_dump.json"))) == 2
+    assert builder.add_abstracts(iter_abstracts(str(FIXTURES / "abstracts.xml"))) == 1
+    builder.finish()
+    return LocalIndex(str(path))
+
+
+def test_build_index(tmp_path):
+    index = build_index(tmp_path / "index.sqlite3")
+    assert index.page("рональд_рейган") == ("Рональд Рейган", "Q9960", "Рональд Вілсон Рейган — 40-й президент США.")
+    assert index.page("Київ") == ("Київ", "Q1899", None)
+    assert index.page("Сторінка без елемента") is None
+    assert set(index.claims("Q9960")) == {"P21", "P569", "P570", "P101"}
+    assert index.claims("Q7163") is None
+    assert index.labels(["Q7163", "Q5"]) == {"Q7163": "політика"}
+
+
+def test_stale_index(tmp_path):
+    build_index(tmp_path / "index.sqlite3")
+    index = LocalIndex(str(tmp_path / "index.sqlite3"), max_age=-1)
+    assert index.stale
+    assert index.page("Київ") is None
+
+
+async def test_answers_from_index(tmp_path):
+    requests = []
+    manager = make_manager(requests)
+    manager.local_index = build_index(tmp_path / "index.sqlite3")
+    [reagan, kyiv] = await manager.lookup(["Рональд Рейган?", "київ"])
+    assert reagan.qid == "Q9960"
+    assert await manager.get_gender(reagan) == "male"
+    assert await manager.get_birthday(reagan) == "6 лютого 1911"
+    assert await manager.get_deathday(reagan) == "5 червня 2004"
+    assert await manager.get_wikidata_text(reagan, "P101") == ["політика"]
+    assert await manager.get_coords(kyiv) == (50.45, 30.523333)
+    assert (await manager.get_page_summary(reagan)).startswith("Рональд Вілсон Рейган — 40-й президент США.")
+    assert requests == []
+    [page] = await manager.lookup(["Рейган"])
+    assert page.title() == "Рональд Рейган"
+    assert [r["action"] for r in requests] == ["query"]
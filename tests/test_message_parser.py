@@ -1,5 +1,12 @@
+import os
+
+import pytest
+
 from wikibot.parser import MessageParser, Messages, MessageTypes
 
+# These talk to the live Wikipedia and Wikidata APIs, see tests/test_replay.py for the recorded ones
+pytestmark = pytest.mark.skipif(not os.getenv("LIVE_TESTS"), reason="set LIVE_TESTS=1 to run against live APIs")
+
 
 async def test_matches_what_is():
     p = MessageParser()
@@ -0,0 +1,115 @@
+import asyncio
+
+from httpx import AsyncClient
+
+from wikibot.metrics import STAGE_SECONDS, Registry, current_intent, timed
+from wikibot.server import HttpServer
+
+
+def test_render_counter_and_histogram():
+    registry = Registry()
+    counter = registry.counter("test_total", "Test counter", ("host", "status"))
+    counter.inc(host="uk.wikipedia.org", status="200")
+    counter.inc(2, host="uk.wikipedia.org", status="200")
+    histogram = registry.histogram("test_seconds", "Test histogram", ("stage",), buckets=(0.1, 1))
+    histogram.observe(0.05, stage="search")
+    histogram.observe(0.1, stage="search")
+    histogram.observe(3, stage="search")
+    assert registry.render().splitlines() == [
+        "# HELP test_total Test counter",
+        "# TYPE test_total counter",
+        'test_total{host="uk.wikipedia.org",status="200"} 3',
+        "# HELP test_seconds Test histogram",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="search",le="0.1"} 2',
+        'test_seconds_bucket{stage="search",le="1"} 2',
+        'test_seconds_bucket{stage="search",le="+Inf"} 3',
+        'test_seconds_sum{stage="search"} 3.15',
+        'test_seconds_count{stage="search"} 3',
+    ]
+
+
+def test_counter_mirrors_running_total():
+    registry = Registry()
+    counter = registry.counter("test_cache_requests_total", "Test mirrored counter", ("cache", "result"))
+    for hits in (3, 5):
+        counter.set_total(hits, cache="search", result="hit")
+    assert registry.render().splitlines()[1:] == [
+        "# TYPE test_cache_requests_total counter",
+        'test_cache_requests_total{cache="search",result="hit"} 5',
+    ]
+
+
+async def test_timed_uses_intent_of_the_task():
+    async def handle():
+        current_intent.set("birthday")
+        with timed("search") as timer:
+            timer.outcome = "not_found"
+        try:
+            with timed("wikidata"):
+                raise KeyError("P569")
+        except KeyError:
+            pass
+
+    await asyncio.create_task(handle())
+    assert STAGE_SECONDS.count(stage="search", intent="birthday", outcome="not_found") == 1
+    assert STAGE_SECONDS.count(stage="wikidata", intent="birthday", outcome="error") == 1
+    assert current_intent.get() == "none"
+
+
+async def test_metrics_endpoint():
+    registry = Registry()
+    gauge = registry.gauge("test_queue_depth", "Test gauge", ("queue",))
+    registry.add_collector(lambda: gauge.set(7, queue="updates"))
+    server = HttpServer("127.0.0.1", 0)
+    server.route("GET", "/metrics", registry.handle)
+    await server.start()
+    try:
+        async with AsyncClient(base_url=f"http://127.0.0.1:{server.bound_port}") as client:
+            response = await client.get("/metrics")
+    finally:
+        await server.stop()
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'test_queue_depth{queue="updates"} 7' in response.text
+
+
+async def test_bad_content_length_is_rejected():
+    server = HttpServer("127.0.0.1", 0)
+    await server.start()
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.bound_port)
+        writer.write(b"POST /telegram HTTP/1.1\r\nContent-Length: -5\r\n\r\n")
+        status_line = await reader.readline()
+        writer.close()
+    finally:
+        await server.stop()
+    assert status_line.startswith(b"HTTP/1.1 400")
+
+
+async def test_slow_request_times_out():
+    server = HttpServer("127.0.0.1", 0, read_timeout=0.1)
+    await server.start()
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.bound_port)
+        writer.write(b"POST /telegram HTTP/1.1\r\nContent-Length: 10\r\n\r\n{")
+        status_line = await asyncio.wait_for(reader.readline(), 5)
+        writer.close()
+    finally:
+        await server.stop()
+    assert status_line.startswith(b"HTTP/1.1 408")
+
+
+async def test_connections_beyond_the_limit_are_refused():
+    server = HttpServer("127.0.0.1", 0, read_timeout=0.2, max_connections=1)
+    await server.start()
+    try:
+        _, idle = await asyncio.open_connection("127.0.0.1", server.bound_port)
+        await asyncio.sleep(0.05)
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.bound_port)
+        status_line = await asyncio.wait_for(reader.readline(), 5)
+        writer.close()
+        idle.close()
+    finally:
+        await server.stop()
+    assert status_line.startswith(b"HTTP/1.1 503")
@@ -0,0 +1,34 @@
+import pymorphy3
+
+from wikibot.morph import GenitiveLemmatizer, GenitiveTable, build_genitive_table
+
+morph = pymorphy3.MorphAnalyzer(lang="uk")
+
+
+def test_lemmatizer_memo():
+    lemmatizer = GenitiveLemmatizer(morph)
+    assert lemmatizer.nominative("Києва") == "київ"
+    assert lemmatizer.nominative("києва") == "київ"
+    assert lemmatizer.nominative("Фото") == "фото"
+    stats = lemmatizer.stats()
+    assert stats.analyzer_calls == 2
+    assert stats.cache_hits >= 1
+
+
+def test_genitive_table(tmp_path):
+    path = str(tmp_path / "genitive.bin")
+    count = build_genitive_table(path, morph, words=["києва", "львова", "шевченка", "фото", "місто"])
+    assert count == 5
+    table = GenitiveTable(path)
+    assert len(table) == 5
+    assert table.get("львова") == "львів"
+    assert table.get("фото") == "фото"
+    assert table.get("місто") == ""
+    assert table.get("ґзщ") is None
+    lemmatizer = GenitiveLemmatizer(morph, table=table)
+    assert lemmatizer.nominative("Шевченка") == "шевченко"
+    assert lemmatizer.nominative("місто") is None
+    assert lemmatizer.stats().analyzer_calls == 0
+    lemmatizer.nominative("ґзщ")
+    assert lemmatizer.stats().analyzer_calls == 1
+    table.close()
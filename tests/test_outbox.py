@@ -0,0 +1,91 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from telegram import Chat, Message
+from telegram.error import BadRequest, RetryAfter
+
+from wikibot.config import config
+from wikibot.outbox import Outbox
+
+
+class RecordingBot:
+    def __init__(self, flood: int = 0):
+        self.calls = []
+        self.flood = flood
+
+    async def send_message(self, **kwargs):
+        if self.flood:
+            self.flood -= 1
+            raise RetryAfter(0)
+        self.calls.append(("text", kwargs["text"]))
+        return SimpleNamespace(photo=None)
+
+    async def send_media_group(self, media, **_):
+        self.calls.append(("media_group", len(media)))
+        return [SimpleNamespace(photo=[SimpleNamespace(file_id=f"file-{i}")]) for i in range(len(media))]
+
+
+class StaleFileIdBot(RecordingBot):
+    async def send_photo(self, photo, **_):
+        if isinstance(photo, str):
+            raise BadRequest("Wrong file identifier/http url specified")
+        self.calls.append(("photo", photo))
+        return SimpleNamespace(photo=[SimpleNamespace(file_id="fresh")])
+
+
+class FileIds(dict):
+    def set(self, url, file_id):
+        self[url] = file_id
+
+    def discard(self, url):
+        self.pop(url, None)
+
+
+def make_message(bot, chat_type=Chat.SUPERGROUP):
+    message = Message(1, datetime.now(timezone.utc), Chat(id=-100, type=chat_type), text="питання")
+    message.set_bot(bot)
+    return message
+
+
+async def test_text_replies_are_merged_within_limit():
+    bot = RecordingBot()
+    outbox = Outbox()
+    message = make_message(bot)
+    futures = [outbox.reply_text(message, text) for text in ("перша", "друга", "x" * 4090)]
+    for future in futures:
+        await future
+    assert bot.calls == [("text", "перша\n\nдруга"), ("text", "x" * 4090)]
+    assert outbox.pending == 0 and not outbox.workers
+
+
+async def test_photos_go_in_one_media_group():
+    bot = RecordingBot()
+    file_ids = FileIds()
+    outbox = Outbox(file_ids)
+    message = make_message(bot)
+    futures = [outbox.reply_photo(message, b"jpeg", f"фото {i}", f"https://upload/{i}.jpg") for i in range(3)]
+    messages = [await future for future in futures]
+    assert bot.calls == [("media_group", 3)]
+    assert messages[2].photo[-1].file_id == "file-2"
+    assert file_ids == {f"https://upload/{i}.jpg": f"file-{i}" for i in range(3)}
+
+
+async def test_flood_limit_is_retried(monkeypatch):
+    monkeypatch.setattr(config, "telegram_send_retries", 1)
+    bot = RecordingBot(flood=1)
+    outbox = Outbox()
+    await outbox.reply_text(make_message(bot, Chat.PRIVATE), "Київ")
+    assert bot.calls == [("text", "Київ")]
+
+
+async def test_rejected_file_id_is_uploaded_again():
+    bot = StaleFileIdBot()
+    file_ids = FileIds({"https://upload/1.jpg": "stale"})
+
+    async def download(url):
+        return b"jpeg"
+
+    outbox = Outbox(file_ids, download)
+    await outbox.reply_photo(make_message(bot), "stale", "фото", "https://upload/1.jpg")
+    assert bot.calls == [("photo", b"jpeg")]
+    assert file_ids == {"https://upload/1.jpg": "fresh"}
@@ -0,0 +1,62 @@
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+from httpx import AsyncClient, MockTransport, Response
+
+from tests.test_async_wiki import make_manager
+from wikibot.config import config
+from wikibot.recent_changes import RecentChangesFeed
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+async def test_summary_cache_is_validated_by_revision():
+    requests = []
+    manager = make_manager(requests)
+    page = await manager.search_page("Рейган")
+    summary = await manager.get_page_summary(page)
+    manager.get_plain_text = None
+    assert await manager.get_page_summary(await manager.search_page("рейган")) is summary
+    assert manager.summaries.get(1)[0] == 100
+    assert [r.get("generator") for r in requests] == ["search"]
+
+
+async def test_recent_changes_replay_invalidates_summary():
+    requests = []
+    manager = make_manager(requests)
+    page = await manager.search_page("Рейган")
+    old = await manager.get_page_summary(page)
+
+    feed = RecentChangesFeed(manager, str(FIXTURES / "recentchanges.txt"))
+    await feed.run()
+    assert feed.changes == 2
+    assert feed.last_event_id.endswith('"offset":3}]')
+    assert manager.revisions.get("Рональд Рейган") == 101
+
+    fresh = await manager.get_page_summary(await manager.search_page("Рейган"))
+    assert fresh != old and fresh.startswith("Рональд Рейган — оновлений вступ.")
+    assert await manager.get_page_summary(page) is fresh
+    assert [r.get("prop") for r in requests].count("extracts") == 1
+
+
+async def test_recent_changes_stream_survives_unexpected_errors(monkeypatch):
+    monkeypatch.setattr(config, "recent_changes_reconnect", 0)
+    noted = []
+    attempts = []
+
+    def handler(request):
+        attempts.append(request.headers.get("last-event-id"))
+        if len(attempts) == 1:
+            raise RuntimeError("stream reset")
+        return Response(200, content=(FIXTURES / "recentchanges.txt").read_bytes())
+
+    manager = SimpleNamespace(note_revision=lambda *change: noted.append(change))
+    async with AsyncClient(transport=MockTransport(handler)) as client:
+        feed = RecentChangesFeed(manager, "https://stream.example/recentchange", client)
+        task = asyncio.create_task(feed.run())
+        while feed.changes < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+    assert noted[:2] == [("Рональд Рейган", 101), ("Нова стаття", 200)]
+    assert attempts[:2] == [None, None]
@@ -0,0 +1,70 @@
+import time
+from pathlib import Path
+
+import pytest
+from httpx import AsyncClient, MockTransport, Response
+
+from wikibot.config import config
+from wikibot.parser import MessageParser, MessageTypes
+from wikibot.replay import Cassette, ReplayServer, request_key
+
+CASSETTE = Path(__file__).parent / "fixtures" / "replay.jsonl"
+
+
+@pytest.fixture
+async def replay(monkeypatch):
+    server = ReplayServer(Cassette(str(CASSETTE)))
+    await server.start()
+    for name, value in server.environment().items():
+        monkeypatch.setattr(config, name.lower(), value)
+    monkeypatch.setattr(config, "file_id_cache_path", None)
+    yield server
+    await server.stop()
+
+
+def test_request_key_ignores_parameter_order():
+    assert request_key("/uk/w/api.php?b=2&a=1") == request_key("/uk/w/api.php?a=1&b=2")
+
+
+async def test_parser_against_replay(replay):
+    parser = MessageParser()
+    response, message_type = await parser.get_response("Коли народився Рональд Рейган?")
+    assert (response, message_type) == (["Рональд Рейган народився 6 лютого 1911"], MessageTypes.TEXT)
+    response, message_type = await parser.get_response("Де розташований Київ")
+    assert (response, message_type) == ([(50.45, 30.523333)], MessageTypes.COORDS)
+    response, _ = await parser.get_response("Знайди фото Києва")
+    assert isinstance(response[0][0], bytes)
+    assert "Category:Kyiv" in response[0][1]
+    response, _ = await parser.get_response("Дивись [[Рейган]] і [[oooòoooo]]")
+    assert response == [f"{replay.base_url}/uk/wiki/Рональд_Рейган"]
+    assert "Читати у Вікіпедії" in await parser.get_command_response("random")
+    assert replay.misses == 0
+    await parser.http_client.aclose()
+
+
+async def test_unrecorded_request_and_latency(replay):
+    replay.latency = 0.05
+    async with AsyncClient(base_url=replay.base_url) as client:
+        started = time.perf_counter()
+        response = await client.get("/uk/w/api.php", params={"action": "query", "titles": "Невідомо"})
+    assert response.status_code == 404
+    assert time.perf_counter() - started >= 0.05
+    assert replay.misses == 1
+
+
+async def test_record_appends_to_cassette(tmp_path):
+    def upstream(request):
+        assert request.url.host == "uk.wikipedia.org"
+        return Response(200, json={"batchcomplete": True, "link": "https://uk.wikipedia.org/wiki/Київ"})
+
+    path = tmp_path / "cassette.jsonl"
+    server = ReplayServer(Cassette(str(path)), upstream=AsyncClient(transport=MockTransport(upstream)))
+    await server.start()
+    base_url = server.base_url
+    try:
+        async with AsyncClient(base_url=base_url) as client:
+            response = await client.get("/uk/w/api.php?action=query&meta=siteinfo")
+    finally:
+        await server.stop()
+    assert response.json() == {"batchcomplete": True, "link": f"{base_url}/uk/wiki/Київ"}
+    assert Cassette(str(path)).get(request_key("/uk/w/api.php?meta=siteinfo&action=query")).status == 200
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from wikibot.concurrency import Overloaded
+from wikibot.config import config
+from wikibot.morph import shared_analyzer
+from wikibot.parser import MessageParser
+from wikibot.wiki import AsyncWikiManager
+
+
+@pytest.fixture
+async def parser(monkeypatch):
+    """A parser that stays offline, without the random pool that would start fetching in the background."""
+    monkeypatch.setattr(config, "random_pool_high", 0)
+    parser = MessageParser(wiki_manager=AsyncWikiManager())
+    yield parser
+    await parser.wiki_manager.api.aclose()
+    await parser.http_client.aclose()
+
+
+async def test_parser_is_lazy_until_warm_up(parser):
+    assert parser.wiki_manager.random_pool is None
+    assert not parser.ready
+    assert parser.wiki_manager.lemmatizer._morph is None
+    assert parser.start_warm_up() is parser.start_warm_up()
+    await parser.wait_ready()
+    assert parser.ready
+    assert parser.wiki_manager.lemmatizer.morph is shared_analyzer()
+    other = AsyncWikiManager()
+    assert other.lemmatizer.morph is shared_analyzer()
+    await other.api.aclose()
+
+
+async def test_failed_warm_up_is_retried(parser):
+    manager = parser.wiki_manager
+    attempts = []
+
+    async def warm_up():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("uk.wikipedia.org")
+
+    manager.warm_up = warm_up
+    try:
+        await parser.wait_ready()
+    except ConnectionError:
+        pass
+    await asyncio.sleep(0)
+    assert not parser.ready
+    await parser.wait_ready()
+    assert parser.ready and len(attempts) == 2
+
+
+async def test_static_answers_do_not_wait_for_warm_up(parser):
+    parser.wiki_manager.warm_up = asyncio.Event().wait
+    assert await asyncio.wait_for(parser.get_command_response("help"), 1)
+    assert await asyncio.wait_for(parser.get_command_response("wiki"), 1) == "https://uk.wikipedia.org/"
+    stream, _ = await asyncio.wait_for(parser.get_response_stream("@ukwikibot"), 1)
+    assert [message async for message in stream] == ["Га?"]
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(parser.get_command_response("random"), 0.05)
+    assert not parser.ready
+    parser._warm_up.cancel()
+
+
+async def test_low_priority_messages_are_shed_under_load(parser):
+    await parser.wait_ready()
+    parser.fan_out.waiting = config.fan_out_backlog
+    with pytest.raises(Overloaded):
+        await parser.get_response_stream("@ukwikibot привіт")
+    with pytest.raises(Overloaded):
+        await parser.get_response_stream("[[Київ]] і [[Львів]]")
+    stream, _ = await parser.get_response_stream("[[Київ]]")
+    assert stream is not None
+    parser.fan_out.waiting = 0
+    assert [message async for message in (await parser.get_response_stream("@ukwikibot"))[0]] == ["Га?"]
+
+
+async def test_zero_backlog_is_unbounded(parser, monkeypatch):
+    monkeypatch.setattr(config, "fan_out_backlog", 0)
+    manager = parser.wiki_manager
+    manager.fan_out.waiting = 1000
+    assert not manager.overloaded
+
+
+def test_validate_names_missing_credentials_only(monkeypatch, capsys):
+    monkeypatch.setattr(config, "wiki_disable_auth", False)
+    monkeypatch.setattr(config, "wiki_consumer_token", "secret-consumer-token")
+    monkeypatch.setattr(config, "wiki_username", None)
+    with pytest.raises(ValueError) as error:
+        config.validate()
+    assert "WIKI_USERNAME" in str(error.value)
+    assert "WIKI_CONSUMER_TOKEN" not in str(error.value)
+    assert "secret-consumer-token" not in capsys.readouterr().out + str(error.value)
@@ -0,0 +1,29 @@
+from wikibot.storage import FileIdCache
+
+URL = "https://upload.wikimedia.org/wikipedia/commons/thumb/a/a0/Kyiv.jpg/800px-Kyiv.jpg"
+
+
+def test_file_id_cache_survives_restart(tmp_path):
+    path = str(tmp_path / "file_ids.sqlite3")
+    cache = FileIdCache(path)
+    assert cache.get(URL) is None
+    cache.set(URL, "AgACAgIAAxkBAAI")
+    cache.close()
+    cache = FileIdCache(path)
+    assert cache.get(URL) == "AgACAgIAAxkBAAI"
+    cache.discard(URL)
+    assert cache.get(URL) is None
+
+
+def test_file_id_cache_eviction(tmp_path):
+    cache = FileIdCache(str(tmp_path / "file_ids.sqlite3"), maxsize=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    expired = FileIdCache(str(tmp_path / "expired.sqlite3"), ttl=-1)
+    expired.set("a", "1")
+    assert expired.get("a") is None
@@ -0,0 +1,51 @@
+import gzip
+
+from tests.test_async_wiki import make_manager
+from wikibot.parser import MessageParser
+from wikibot.titles import TitleIndex, title_id
+
+TITLES = ["Київ", "Київська_Русь", "Києво-Печерська_лавра", "Кий", "київ_(значення)", "Львів", "Рональд_Рейган"]
+
+
+def test_complete_prefix():
+    index = TitleIndex(TITLES)
+    assert index.complete("киї", 10) == ["Київ", "київ (значення)", "Київська Русь"]
+    assert index.complete("Київ", 2, offset=2) == ["Київська Русь"]
+    assert index.complete("Одеса", 10) == []
+    assert index.complete("  ", 10) == []
+    assert all(index.title(title_id(title)) == title for title in index.titles)
+    assert index.title(title_id("Одеса")) is None
+    assert index.title("not an id") is None
+
+
+def test_result_ids_survive_a_reload():
+    index = TitleIndex(TITLES)
+    reloaded = TitleIndex(TITLES + ["Одеса", "Аарон"])
+    assert len(title_id("Львів")) <= 64
+    assert reloaded.title(title_id("Львів")) == index.title(title_id("Львів")) == "Львів"
+
+
+def test_load_titles_dump(tmp_path):
+    path = tmp_path / "titles.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write("page_title\n" + "\n".join(TITLES) + "\n")
+    assert len(TitleIndex.from_file(str(path))) == len(TITLES)
+
+
+async def test_chosen_suggestion_gets_search_summary():
+    requests = []
+    manager = make_manager(requests)
+    manager.titles = TitleIndex(TITLES)
+    parser = MessageParser(wiki_manager=manager)
+    [(result_id, title)] = parser.get_suggestions("рональд")
+    searched = []
+
+    async def search(text):
+        searched.append(text)
+        return f"summary of {text}"
+
+    manager.search = search
+    assert result_id == title_id(title)
+    assert await parser.get_suggestion_summary(result_id) == f"summary of {title}"
+    assert await parser.get_suggestion_summary("not an id") is None
+    assert searched == [title]
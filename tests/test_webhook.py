@@ -0,0 +1,34 @@
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+from httpx import AsyncClient
+
+from wikibot.webhook import SECRET_HEADER, WebhookServer
+
+UPDATE = (Path(__file__).parent / "fixtures" / "update_whatis.json").read_bytes()
+
+
+async def test_webhook_queues_recorded_update():
+    application = SimpleNamespace(bot=None, update_queue=asyncio.Queue(), running=True, bot_data={})
+    webhook = WebhookServer(application, "127.0.0.1", 0, "/telegram", secret_token="secret")
+    await webhook.server.start()
+    url = f"http://127.0.0.1:{webhook.server.bound_port}"
+    try:
+        async with AsyncClient(base_url=url) as client:
+            assert (await client.post("/telegram", content=UPDATE)).status_code == 403
+            response = await client.post("/telegram", content=UPDATE, headers={SECRET_HEADER: "secret"})
+            assert response.status_code == 200
+            assert (await client.post("/telegram", content=b"{", headers={SECRET_HEADER: "secret"})).status_code == 400
+            for body in (b"[]", b"42", b"null"):
+                response = await client.post("/telegram", content=body, headers={SECRET_HEADER: "secret"})
+                assert response.status_code == 400
+            assert (await client.get("/healthz")).status_code == 200
+            application.running = False
+            assert (await client.get("/healthz")).status_code == 503
+    finally:
+        await webhook.stop()
+    update = application.update_queue.get_nowait()
+    assert update.update_id == 874512390
+    assert update.message.text == "Що таке Вікіпедія?"
+    assert application.update_queue.empty()
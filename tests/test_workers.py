@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import queue
+import time
+from datetime import datetime, timezone
+from functools import partial
+from types import SimpleNamespace
+
+import pytest
+from telegram import Chat, Message, Update, User
+
+from wikibot.api import WikiPage
+from wikibot.cache import TTLCache
+from wikibot.shared_cache import SharedStore, TieredCache
+from wikibot.wiki import WikiManager
+from wikibot.workers import Router, WorkersFailed, forward_updates, shard_of
+
+
+def make_update(update_id, chat_id):
+    chat = Chat(id=chat_id, type=Chat.SUPERGROUP)
+    user = User(id=7, first_name="Тест", is_bot=False)
+    return Update(update_id, message=Message(update_id, datetime.now(timezone.utc), chat, from_user=user, text="Київ"))
+
+
+def record_updates(directory, index, updates):
+    """Worker that writes the update ids it was given to a file named after its index."""
+    received = []
+    while (data := updates.get()) is not None:
+        received.append(json.loads(data)["update_id"])
+    with open(f"{directory}/{index}.json", "w") as f:
+        json.dump(received, f)
+
+
+def crash_once(directory, index, updates):
+    """Worker that dies on its first start, before reading any update."""
+    marker = f"{directory}/{index}.crashed"
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    record_updates(directory, index, updates)
+
+
+async def test_router_keeps_chats_on_one_worker(tmp_path):
+    router = Router(2, partial(record_updates, str(tmp_path)))
+    router.start()
+    for update_id, chat_id in enumerate([-100, -101, -100, -103, -101]):
+        await router.route(make_update(update_id, chat_id), None)
+    await router.stop(timeout=30)
+    received = [json.loads((tmp_path / f"{index}.json").read_text()) for index in range(2)]
+    assert received == [[0, 2], [1, 3, 4]]
+    assert router.routed == [2, 3]
+
+
+async def test_router_restarts_dead_workers(tmp_path):
+    router = Router(1, partial(crash_once, str(tmp_path)), check_interval=0.05)
+    router.start()
+    for update_id in range(3):
+        await router.route(make_update(update_id, -100), None)
+    for _ in range(600):
+        if router.restarts:
+            break
+        await asyncio.sleep(0.05)
+    await router.stop(timeout=30)
+    assert router.restarts == 1
+    assert json.loads((tmp_path / "0.json").read_text()) == [0, 1, 2]
+
+
+def crash_always(index, updates):
+    os._exit(1)
+
+
+async def test_router_gives_up_on_a_crashing_worker():
+    router = Router(1, crash_always, check_interval=0.05, max_restarts=2)
+    router.start()
+    started = time.monotonic()
+    with pytest.raises(WorkersFailed):
+        await asyncio.wait_for(router.supervisor, 60)
+    with pytest.raises(WorkersFailed):
+        router.check()
+    await router.stop(timeout=30)
+    assert router.restarts == 2
+    # The second restart waits twice as long as the first
+    assert time.monotonic() - started >= 0.05 + 0.1
+
+
+async def test_forward_updates_until_stopped():
+    application = SimpleNamespace(update_queue=asyncio.Queue(), bot=None)
+    updates = queue.Queue()
+    updates.put(make_update(1, -100).to_json())
+    updates.put(None)
+    await forward_updates(application, updates)
+    update = application.update_queue.get_nowait()
+    assert (update.update_id, update.message.text, shard_of(update, 4)) == (1, "Київ", -100 % 4)
+
+
+def test_tiered_cache_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    first = TieredCache(TTLCache(maxsize=10, ttl=60), SharedStore(path), "search")
+    second = TieredCache(TTLCache(maxsize=10, ttl=60), SharedStore(path), "search")
+    first.set("рейган", WikiPage("Рональд Рейган", pageid=1, qid="Q9960", lastrevid=100, extract="40-й президент"))
+    first.set("oooòoooo", None, ttl=5)
+    first.set("object", object())
+    assert first.store.flush(timeout=10)
+    page = second.get("рейган")
+    assert (page.title(), page.qid, page.lastrevid) == ("Рональд Рейган", "Q9960", 100)
+    assert second.get("oooòoooo", "missing") is None
+    assert second.get("object", "missing") == "missing"
+    assert second.stats().hits == 2
+    assert "рейган" in second and second.local.get("oooòoooo") is None
+    second.pop("рейган")
+    second.store.close()
+    assert "рейган" not in TieredCache(TTLCache(maxsize=10, ttl=60), SharedStore(path), "search")
+
+
+def test_shared_store_writes_do_not_wait_for_other_writers(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    store = SharedStore(path)
+    other = SharedStore(path)
+    other.writer.execute("BEGIN IMMEDIATE")
+    started = time.perf_counter()
+    store.set("search", "київ", '"Київ"', 60, 10)
+    assert time.perf_counter() - started < 0.5
+    assert not store.flush(timeout=0.2)
+    other.writer.execute("COMMIT")
+    assert store.flush(timeout=10)
+    assert store.get("search", "київ")[0] == '"Київ"'
+
+
+async def test_shared_entity_id_still_loads_the_item_once(tmp_path):
+    manager = WikiManager()
+    manager.entity_ids = TieredCache(TTLCache(maxsize=10, ttl=60), SharedStore(str(tmp_path / "shared.sqlite3")), "ids")
+    manager.entity_ids.store.set("ids", TieredCache.key("Київ"), '"Q1899"', 60, 10)
+    manager.entity_ids.store.flush()
+    loads = []
+
+    def load_item(page):
+        loads.append(page.title())
+        manager.entities.set("Q1899", object())
+
+    manager._load_item = load_item
+    page = SimpleNamespace(title=lambda: "Київ")
+    assert "Київ" in manager.entity_ids and manager.cached_item(page) is None
+    await asyncio.gather(manager.load_item(page), manager.load_item(page))
+    await manager.load_item(page)
+    assert loads == ["Київ"] and manager.cached_item(page) is not None
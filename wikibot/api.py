@@ -0,0 +1,75 @@
+import logging
+from typing import Any, Dict
+from urllib.parse import quote
+
+from httpx import AsyncClient
+
+from wikibot.config import config
+from wikibot.http_client import create_http_client
+
+logger = logging.getLogger(__name__)
+
+
+class ApiError(Exception):
+    def __init__(self, code: str, info: str = ""):
+        super().__init__(f"{code}: {info}")
+        self.code = code
+        self.info = info
+
+
+class WikiPage:
+    """Page returned by the async backend, mirrors the parts of pywikibot.Page the bot uses."""
+
+    def __init__(
+        self,
+        title: str,
+        pageid: int | None = None,
+        qid: str | None = None,
+        lastrevid: int | None = None,
+        extract: str | None = None,
+    ):
+        self._title = title
+        self.pageid = pageid
+        self.qid = qid
+        self.lastrevid = lastrevid
+        self.extract = extract
+
+    def title(self) -> str:
+        return self._title
+
+    def full_url(self) -> str:
+        return f"{config.wiki_article_url}{quote(self._title.replace(' ', '_'))}"
+
+    def __str__(self) -> str:
+        return f"[[uk:{self._title}]]"
+
+    def __repr__(self) -> str:
+        return f"WikiPage({self._title!r})"
+
+
+class WikiApiClient:
+    """Minimal asyncio client for the MediaWiki Action API and Wikidata."""
+
+    def __init__(self, client: AsyncClient | None = None):
+        self.client = client or create_http_client()
+
+    async def request(self, url: str, **params: Any) -> Dict[str, Any]:
+        params.update(format="json", formatversion=2, maxlag=config.wiki_maxlag)
+        response = await self.client.get(url, params=params)
+        response.raise_for_status()
+        data = response.json()
+        if "error" in data:
+            raise ApiError(data["error"].get("code", "unknown"), data["error"].get("info", ""))
+        return data
+
+    async def wikipedia(self, **params: Any) -> Dict[str, Any]:
+        return await self.request(config.wiki_api_url, **params)
+
+    async def wikidata(self, **params: Any) -> Dict[str, Any]:
+        return await self.request(config.wikidata_api_url, **params)
+
+    async def commons(self, **params: Any) -> Dict[str, Any]:
+        return await self.request(config.commons_api_url, **params)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
@@ -0,0 +1,191 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Mapping, Tuple
+
+from wikibot.cache import CacheStats
+
+QUERY_MODULES = ("prop", "list", "meta", "generator")
+# Parameters that do not change the answer, left out of the key so a response outlives their settings
+IGNORED_PARAMS = ("maxlag",)
+# Share of the size cap kept after an eviction, so a full cache does not evict on every write
+LOW_WATER = 0.9
+
+
+def parse_ttls(spec: str) -> Dict[str, float]:
+    """Parse ``module=seconds,...`` such as ``query+search=3600,wbgetentities=21600``."""
+    ttls = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        module, _, seconds = item.partition("=")
+        ttls[module.strip()] = float(seconds)
+    return ttls
+
+
+def api_modules(params: Mapping[str, str]) -> List[str]:
+    """Modules an API request calls, ``query+<module>`` for every prop, list, meta and generator of a query."""
+    action = params.get("action", "query")
+    if action != "query":
+        return [action]
+    names = {name for key in QUERY_MODULES for name in params.get(key, "").split("|") if name}
+    return [f"query+{name}" for name in sorted(names)] or ["query"]
+
+
+def request_key(site: str, params: Mapping[str, str]) -> str:
+    items = sorted((name, value) for name, value in params.items() if name not in IGNORED_PARAMS)
+    return hashlib.sha256(json.dumps([site, items], ensure_ascii=False).encode()).hexdigest()
+
+
+class ResponseCache:
+    """Persistent cache of decoded API responses in one SQLite file.
+
+    Responses are stored as compressed JSON with the modules that produced them and expire after the TTL of
+    their most volatile module, modules without a TTL are not cached. Above ``max_bytes`` the least recently
+    used responses are evicted. The file outlives restarts and can be shared by worker processes, so the
+    total size is kept in the file by triggers rather than summed up on every write.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, ttls: Dict[str, float] | None = None):
+        self.max_bytes = max_bytes
+        self.ttls = ttls or {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=5)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        # INSERT OR REPLACE fires the delete trigger for the replaced row only with recursive triggers
+        self.connection.execute("PRAGMA recursive_triggers=ON")
+        self.connection.execute("BEGIN IMMEDIATE")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, endpoint TEXT NOT NULL, data BLOB NOT NULL, "
+            "size INTEGER NOT NULL, created REAL NOT NULL, expires REAL NOT NULL, used REAL NOT NULL, "
+            "hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS total (id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER NOT NULL)"
+        )
+        self.connection.execute(
+            "INSERT OR IGNORE INTO total (id, size) VALUES (0, (SELECT COALESCE(SUM(size), 0) FROM responses))"
+        )
+        self.connection.execute(
+            "CREATE TRIGGER IF NOT EXISTS responses_inserted AFTER INSERT ON responses "
+            "BEGIN UPDATE total SET size = size + NEW.size; END"
+        )
+        self.connection.execute(
+            "CREATE TRIGGER IF NOT EXISTS responses_deleted AFTER DELETE ON responses "
+            "BEGIN UPDATE total SET size = size - OLD.size; END"
+        )
+        self.connection.execute("COMMIT")
+
+    def ttl(self, modules: List[str], default: float = 0) -> float:
+        """TTL of a response from ``modules``, ``default`` applies to modules without one of their own."""
+        return min(self.ttls.get(module, default) for module in modules)
+
+    def get(self, key: str) -> Tuple[Any, float] | None:
+        """Return the response and the time it was stored."""
+        now = time.time()
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT data, created FROM responses WHERE key = ? AND expires > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.connection.execute("UPDATE responses SET used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        return json.loads(zlib.decompress(row[0])), row[1]
+
+    def set(self, key: str, endpoint: str, response: Any, ttl: float) -> None:
+        data = zlib.compress(json.dumps(response, ensure_ascii=False, separators=(",", ":")).encode())
+        now = time.time()
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, data, size, created, expires, used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, data, len(data), now, now + ttl, now),
+            )
+            if self._size() > self.max_bytes:
+                self._evict(now, self.max_bytes * LOW_WATER)
+
+    def _size(self) -> int:
+        return self.connection.execute("SELECT size FROM total").fetchone()[0]
+
+    def _evict(self, now: float, keep_bytes: float) -> int:
+        """Drop expired responses, then the least recently used ones beyond ``keep_bytes``."""
+        removed = self.connection.execute("DELETE FROM responses WHERE expires <= ?", (now,)).rowcount
+        removed += self.connection.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM "
+            "(SELECT key, SUM(size) OVER (ORDER BY used DESC, key) AS total FROM responses) WHERE total > ?)",
+            (keep_bytes,),
+        ).rowcount
+        self.evictions += removed
+        return removed
+
+    def drop(self, endpoint: str) -> int:
+        """Forget the responses of one endpoint, such as ``query+search``."""
+        with self._lock:
+            return self.connection.execute("DELETE FROM responses WHERE endpoint = ?", (endpoint,)).rowcount
+
+    def compact(self) -> Tuple[int, int, int]:
+        """Evict expired and surplus responses and shrink the file, return (removed, bytes before, bytes after)."""
+        with self._lock:
+            before = self.file_size()
+            removed = self._evict(time.time(), self.max_bytes)
+            self.connection.execute("VACUUM")
+            self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return removed, before, self.file_size()
+
+    def file_size(self) -> int:
+        page_count = self.connection.execute("PRAGMA page_count").fetchone()[0]
+        return page_count * self.connection.execute("PRAGMA page_size").fetchone()[0]
+
+    def endpoints(self) -> List[Tuple[str, int, int, int, int]]:
+        """(endpoint, responses, bytes, expired, hits) for every endpoint, the largest first."""
+        with self._lock:
+            return self.connection.execute(
+                "SELECT endpoint, COUNT(*), SUM(size), SUM(expires <= ?), SUM(hits) FROM responses "
+                "GROUP BY endpoint ORDER BY SUM(size) DESC",
+                (time.time(),),
+            ).fetchall()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            size = self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return CacheStats(hits=self.hits, misses=self.misses, evictions=self.evictions, size=size)
+
+    def __len__(self) -> int:
+        return self.stats().size
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect and compact the API response cache")
+    parser.add_argument("path", help="path of the SQLite cache, API_CACHE_PATH")
+    parser.add_argument("--drop", action="append", default=[], metavar="ENDPOINT", help="forget an endpoint")
+    parser.add_argument("--compact", action="store_true", help="evict expired and surplus responses, then VACUUM")
+    parser.add_argument("--max-mb", type=float, default=64, help="size cap applied when compacting")
+    args = parser.parse_args()
+    cache = ResponseCache(args.path, max_bytes=int(args.max_mb * 1024 * 1024))
+    for endpoint in args.drop:
+        print(f"Dropped {cache.drop(endpoint)} responses of {endpoint}")
+    if args.compact:
+        removed, before, after = cache.compact()
+        print(f"Removed {removed} responses, {before / 1024:.0f} KiB -> {after / 1024:.0f} KiB")
+    print(f"{'endpoint':<40} {'responses':>10} {'KiB':>10} {'expired':>8} {'hits':>8}")
+    for endpoint, count, size, expired, hits in cache.endpoints():
+        print(f"{endpoint:<40} {count:>10} {size / 1024:>10.1f} {expired:>8} {hits:>8}")
+    print(f"{len(cache)} responses in {cache.file_size() / 1024:.0f} KiB")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,72 +1,199 @@
+import asyncio
+import html
 import logging
+from asyncio import Future
 from functools import partial
-from typing import List, Tuple
+from typing import Any, List, Tuple
 
-from telegram import Update
+from telegram import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+    Update,
+)
 from telegram.constants import ParseMode
-from telegram.ext import Application, ApplicationBuilder, CommandHandler, ContextTypes, MessageHandler
+from telegram.ext import (
+    Application,
+    ApplicationBuilder,
+    ChosenInlineResultHandler,
+    CommandHandler,
+    ContextTypes,
+    InlineQueryHandler,
+    MessageHandler,
+    TypeHandler,
+)
+from telegram.request import HTTPXRequest
 
+from wikibot.api import WikiPage
+from wikibot.concurrency import Overloaded
 from wikibot.config import config
+from wikibot.http_client import create_http_client, shared_ssl_context
+from wikibot.metrics import MESSAGES, current_intent, timed
+from wikibot.outbox import Outbox
 from wikibot.parser import MessageParser, MessageTypes
+from wikibot.workers import Router
 
 logger = logging.getLogger(__name__)
 
+MAX_CAPTION = 1024
 
-async def parse_command(message_parser: MessageParser, update: Update, _: ContextTypes.DEFAULT_TYPE):
+
+async def parse_command(message_parser: MessageParser, outbox: Outbox, update: Update, _: ContextTypes.DEFAULT_TYPE):
     command = update.message.text.lstrip("/").replace("@ukwikibot", "").lower()
     logger.debug(f"{update.message.text} command")
     if message := await message_parser.get_command_response(command):
-        await update.message.reply_text(message, parse_mode=ParseMode.HTML)
-
-
-async def parse_messages(message_parser: MessageParser, update: Update, _: ContextTypes.DEFAULT_TYPE):
-    try:
-        if not update.message or not update.message.text:
-            return
-        messages, message_type = await message_parser.get_response(update.message.text)
-        if not message_type:
-            return
-        messages = filter(lambda m: m, messages)
-        if message_type == MessageTypes.COORDS:
-            await send_coords(update, messages)
-        elif message_type == MessageTypes.IMAGE:
-            await send_image(update, messages)
-        elif message_type == MessageTypes.TEXT:
-            await send_text(update, messages)
-    except Exception:  # noqa
-        logger.exception("Can parse message")
-
-
-async def send_text(update: Update, messages: List[str]):
+        await outbox.reply_text(update.message, message)
+
+
+async def parse_messages(message_parser: MessageParser, outbox: Outbox, update: Update, _: ContextTypes.DEFAULT_TYPE):
+    if not update.message or not update.message.text:
+        return
+    with timed("message") as timer:
+        try:
+            stream, message_type = await message_parser.get_response_stream(update.message.text)
+            if not message_type:
+                timer.outcome = "no_match"
+                return
+            # Answers are queued as they come, those that queue up behind each other go out together
+            if config.response_streaming:
+                futures = [
+                    future
+                    async for message in stream
+                    for future in send_messages(outbox, update, [message], message_type)
+                ]
+            else:
+                futures = send_messages(outbox, update, [message async for message in stream], message_type)
+            with timed("send"):
+                await asyncio.gather(*futures)
+        except Overloaded as e:
+            timer.outcome = "shed"
+            logger.info(f"Dropped a message: {e}")
+        except Exception:  # noqa
+            timer.outcome = "error"
+            logger.exception("Can parse message")
+        finally:
+            MESSAGES.inc(intent=current_intent.get(), outcome=timer.outcome)
+
+
+async def answer_inline_query(message_parser: MessageParser, update: Update, _: ContextTypes.DEFAULT_TYPE):
+    """Suggest titles as the user types, the summary is filled in once a suggestion is chosen."""
+    inline_query = update.inline_query
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+    suggestions = message_parser.get_suggestions(inline_query.query, offset)
+    results = [
+        InlineQueryResultArticle(
+            id=result_id,
+            title=title,
+            input_message_content=InputTextMessageContent(f"<b>{html.escape(title)}</b>", parse_mode=ParseMode.HTML),
+            # Telegram reports the inline_message_id of the sent message only for results with a keyboard
+            reply_markup=InlineKeyboardMarkup(
+                [[InlineKeyboardButton("Читати у Вікіпедії", url=WikiPage(title).full_url())]]
+            ),
+        )
+        for result_id, title in suggestions
+    ]
+    next_offset = str(offset + len(results)) if len(results) == config.inline_results else ""
+    await inline_query.answer(results, cache_time=config.inline_cache_time, next_offset=next_offset)
+
+
+async def send_inline_summary(message_parser: MessageParser, update: Update, _: ContextTypes.DEFAULT_TYPE):
+    chosen = update.chosen_inline_result
+    if not chosen.inline_message_id:
+        return
+    with timed("message", intent="inline") as timer:
+        try:
+            if summary := await message_parser.get_suggestion_summary(chosen.result_id):
+                await update.get_bot().edit_message_text(
+                    summary, inline_message_id=chosen.inline_message_id, parse_mode=ParseMode.HTML
+                )
+            else:
+                timer.outcome = "not_found"
+        except Exception:  # noqa
+            timer.outcome = "error"
+            logger.exception("Can't send summary of the chosen suggestion")
+        finally:
+            MESSAGES.inc(intent="inline", outcome=timer.outcome)
+
+
+def send_messages(outbox: Outbox, update: Update, messages: List[Any], message_type: MessageTypes) -> List[Future]:
+    """Queue the answers in the outbox and return the futures of their delivery."""
+    messages = filter(lambda m: m, messages)
+    if message_type == MessageTypes.COORDS:
+        return send_coords(outbox, update, messages)
+    elif message_type == MessageTypes.IMAGE:
+        return send_image(outbox, update, messages)
+    elif message_type == MessageTypes.TEXT:
+        return send_text(outbox, update, messages)
+    return []
+
+
+def send_text(outbox: Outbox, update: Update, messages: List[str]) -> List[Future]:
+    futures = []
     for text in messages:
         logger.debug(f"Text answer: {text}. Text request: {update.message.text}")
-        await update.message.reply_text(text, parse_mode=ParseMode.HTML)
+        futures.append(outbox.reply_text(update.message, text))
+    return futures
 
 
-async def send_coords(update: Update, messages: List[Tuple[float, float]]):
+def send_coords(outbox: Outbox, update: Update, messages: List[Tuple[float, float]]) -> List[Future]:
+    futures = []
     for latitude, longitude in messages:
         logger.debug(f"Coords: {latitude} {longitude}. Text: {update.message.text}")
-        await update.message.reply_location(latitude, longitude)
+        futures.append(outbox.reply_location(update.message, latitude, longitude))
+    return futures
 
 
-async def send_image(update: Update, messages: List[Tuple[bytes | None, str | None]]):
-    for image, description_message in messages:
+def send_image(
+    outbox: Outbox, update: Update, messages: List[Tuple[bytes | str | None, str | None, str | None]]
+) -> List[Future]:
+    """Send each image with its description as the caption, descriptions without an image as text."""
+    futures = []
+    for image, description_message, image_url in messages:
+        caption = description_message if description_message and len(description_message) <= MAX_CAPTION else None
         if image:
             logger.debug(f"Sending image. Text: {update.message.text}")
-            await update.message.reply_photo(photo=image)
-        if description_message:
+            futures.append(outbox.reply_photo(update.message, image, caption, image_url))
+        if description_message and (not image or caption is None):
             logger.debug(f"Image: {description_message}. Text: {update.message.text}")
-            await update.message.reply_text(
-                description_message,
-                parse_mode=ParseMode.HTML,
-                disable_web_page_preview=True,
-            )
+            futures.append(outbox.reply_text(update.message, description_message, disable_web_page_preview=True))
+    return futures
+
+
+def build_application(updater: bool = True) -> Application:
+    """Workers of the sharded mode get their updates from the front process, so they have no updater."""
+    httpx_kwargs = {"verify": shared_ssl_context()}
+    builder = (
+        ApplicationBuilder()
+        .token(config.telegram_token)
+        .request(HTTPXRequest(connection_pool_size=256, httpx_kwargs=httpx_kwargs))
+    )
+    if updater:
+        builder = builder.get_updates_request(HTTPXRequest(connection_pool_size=1, httpx_kwargs=httpx_kwargs))
+    else:
+        builder = builder.updater(None)
+    return builder.build()
+
+
+async def setup_front(router: Router) -> Application:
+    """Application of the front process, it only routes updates to the workers."""
+    app = build_application()
+    app.bot_data["router"] = router
+    app.add_handler(TypeHandler(Update, router.route))
+    return app
 
 
-async def setup_bot() -> Application:
-    app = ApplicationBuilder().token(config.telegram_token).build()
-    parser = MessageParser()
+async def setup_bot(updater: bool = True) -> Application:
+    app = build_application(updater)
+    http_client = create_http_client()
+    app.bot_data["http_client"] = http_client
+    parser = MessageParser(http_client=http_client)
+    app.bot_data["message_parser"] = parser
+    outbox = Outbox(parser.file_ids, parser.download_image)
+    app.bot_data["outbox"] = outbox
     for cmd in MessageParser.COMMANDS.keys():
-        app.add_handler(CommandHandler(command=cmd, callback=partial(parse_command, parser), block=False))
-    app.add_handler(MessageHandler(filters=None, callback=partial(parse_messages, parser), block=False))
+        app.add_handler(CommandHandler(command=cmd, callback=partial(parse_command, parser, outbox), block=False))
+    app.add_handler(MessageHandler(filters=None, callback=partial(parse_messages, parser, outbox), block=False))
+    app.add_handler(InlineQueryHandler(callback=partial(answer_inline_query, parser), block=False))
+    app.add_handler(ChosenInlineResultHandler(callback=partial(send_inline_summary, parser), block=False))
     return app
@@ -0,0 +1,324 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Hashable, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+
+class FanOut:
+    """Runs one coroutine per item concurrently under a per-call and a process-wide limit.
+
+    Results are yielded in the order of the items, whatever order they complete in. An item that
+    takes longer than ``timeout`` seconds or fails yields None instead of holding back the rest.
+    """
+
+    def __init__(self, per_call: int, total: int, timeout: float | None = None):
+        self.per_call = per_call
+        self.semaphore = asyncio.Semaphore(total)
+        self.timeout = timeout
+        self.waiting = 0
+        self.running = 0
+
+    async def map(self, func: Callable[[Any], Awaitable[Any]], items: Iterable[Any]) -> AsyncIterator[Any]:
+        local = asyncio.Semaphore(self.per_call)
+
+        async def run(item):
+            self.waiting += 1
+            started = False
+            try:
+                async with local, self.semaphore:
+                    self.waiting -= 1
+                    self.running += 1
+                    started = True
+                    return await asyncio.wait_for(func(item), self.timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"{getattr(func, '__name__', func)}({item}) timed out after {self.timeout}s")
+                return None
+            except Overloaded as e:
+                logger.warning(f"{getattr(func, '__name__', func)}({item}) was refused: {e}")
+                return None
+            except Exception:  # noqa
+                logger.exception(f"{getattr(func, '__name__', func)}({item}) failed")
+                return None
+            finally:
+                if started:
+                    self.running -= 1
+                else:
+                    self.waiting -= 1
+
+        tasks = [asyncio.ensure_future(run(item)) for item in items]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def gather(self, func: Callable[[Any], Awaitable[Any]], items: Iterable[Any]) -> List[Any]:
+        return [result async for result in self.map(func, items)]
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one upstream call.
+
+    Callers that arrive while a call is in flight wait for its result instead of starting their own.
+    The shared call is shielded, so a caller that gives up does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self.calls: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(func())
+            self.calls[key] = task
+            task.add_done_callback(partial(self._done, key))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        if not task.cancelled():
+            task.exception()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.calls
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self.calls), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+class Overloaded(Exception):
+    """Raised instead of queueing work behind a full queue."""
+
+
+class ExecutorQueue:
+    """Runs blocking calls in an executor, counting the calls that wait for a thread and the running ones.
+
+    A call whose caller was cancelled before a thread picked it up is dropped instead of run. With
+    ``max_queue``, calls beyond that many waiting ones are refused with Overloaded.
+    """
+
+    def __init__(self, executor: Executor | None = None, max_queue: int | None = None):
+        self.executor = executor
+        self.max_queue = max_queue
+        self.queued = 0
+        self.running = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def bounded(cls, name: str, workers: int, max_queue: int) -> "ExecutorQueue":
+        """A queue with its own pool of ``workers`` threads, so slow calls elsewhere cannot starve it."""
+        return cls(ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name), max_queue)
+
+    @property
+    def pressure(self) -> float:
+        """Share of the queue in use, 0 for unbounded queues."""
+        return self.queued / self.max_queue if self.max_queue else 0.0
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.max_queue and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(f"{self.queued} calls are already waiting for {getattr(func, '__name__', func)}")
+        claimed = []
+
+        def call():
+            with self._lock:
+                if claimed:
+                    return None
+                claimed.append("started")
+                self.queued -= 1
+                self.running += 1
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+
+        with self._lock:
+            self.queued += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+        finally:
+            with self._lock:
+                if not claimed:
+                    claimed.append("abandoned")
+                    self.queued -= 1
+
+
+class AdaptiveLimiter:
+    """Limit on concurrent calls that adapts to the upstream with AIMD.
+
+    Every healthy response grows the limit by 1/limit, about one slot per round of requests. A congestion
+    signal halves it, once per round: responses to calls started before the last decrease are ignored.
+    A Retry-After pauses new calls without holding any slot, waiting never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        maximum: int,
+        minimum: int = 1,
+        decrease: float = 0.5,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.decrease = decrease
+        self.timer = timer
+        self.limit = float(maximum)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = float("-inf")
+        self.decreases = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> float:
+        """Wait for a slot and return the start time to pass to on_congestion."""
+        while True:
+            delay = self.paused_until - self.timer()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return self.timer()
+            else:
+                await self._wait()
+
+    async def _wait(self) -> None:
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # a wake-up meant for this caller goes to the next one
+            self._wake()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _wake(self) -> None:
+        free = int(self.limit) - self.in_flight
+        for waiter in self._waiters:
+            if free <= 0:
+                break
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def on_success(self) -> None:
+        self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+        self._wake()
+
+    def on_congestion(self, started: float, retry_after: float | None = None) -> None:
+        now = self.timer()
+        if retry_after:
+            self.paused_until = max(self.paused_until, now + retry_after)
+        if started >= self.last_decrease:
+            self.limit = max(float(self.minimum), self.limit * self.decrease)
+            self.last_decrease = now
+            self.decreases += 1
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "paused_for": max(0.0, self.paused_until - self.timer()),
+            "decreases": self.decreases,
+        }
+
+
+class RefillPool:
+    """Buffer of ready items refilled in batches by a background task.
+
+    A refill starts when fewer than ``low`` items are left and fetches batches until ``high`` are buffered,
+    so callers are served from memory and only wait when the pool has run dry.
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable[List[Any]]], low: int, high: int):
+        self.fetch = fetch
+        self.low = low
+        self.high = high
+        self.items: Deque[Any] = deque()
+        self.batches = 0
+        self.waits = 0
+        self._refill: asyncio.Task | None = None
+
+    def start_refill(self) -> asyncio.Task:
+        if self._refill is None or self._refill.done():
+            self._refill = asyncio.ensure_future(self._fill())
+            self._refill.add_done_callback(self._refill_done)
+        return self._refill
+
+    async def _fill(self) -> None:
+        while len(self.items) < self.high:
+            batch = await self.fetch()
+            self.batches += 1
+            if not batch:
+                break
+            self.items.extend(batch)
+
+    @staticmethod
+    def _refill_done(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Refill failed: {task.exception()!r}")
+
+    async def get(self) -> Any:
+        if not self.items:
+            self.waits += 1
+            await asyncio.shield(self.start_refill())
+        item = self.items.popleft() if self.items else None
+        if len(self.items) < self.low:
+            self.start_refill()
+        return item
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class TokenBucket:
+    """Allows ``rate`` acquisitions per second on average, with bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: float, timer: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.timer = timer
+        self.tokens = float(burst)
+        self.updated = timer()
+
+    def _reserve(self, tokens: float) -> float:
+        """Take the tokens if they are there, otherwise return how long to wait for them."""
+        now = self.timer()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1) -> float:
+        """Wait until ``tokens`` (at most ``burst``) are available and return the time waited."""
+        tokens = min(tokens, self.burst)
+        waited = 0.0
+        while (delay := self._reserve(tokens)) > 0:
+            await asyncio.sleep(delay)
+            waited += delay
+        return waited
@@ -13,16 +13,100 @@ class Config:
     wiki_access_token = os.getenv("WIKI_ACCESS_TOKEN", None)
     wiki_access_secret = os.getenv("WIKI_ACCESS_SECRET", None)
     wiki_username = os.getenv("WIKI_USERNAME", None)
+    telegram_mode = os.getenv("TELEGRAM_MODE", "polling").lower()
+    webhook_listen = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+    webhook_port = int(os.getenv("WEBHOOK_PORT", 8080))
+    webhook_path = os.getenv("WEBHOOK_PATH", "/telegram")
+    webhook_secret_token = os.getenv("WEBHOOK_SECRET_TOKEN", None)
+    webhook_url = os.getenv("WEBHOOK_URL", None)
+    webhook_drain_timeout = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", 10))
+    webhook_read_timeout = float(os.getenv("WEBHOOK_READ_TIMEOUT", 10))
+    webhook_max_connections = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", 100))
+    telegram_global_rate = float(os.getenv("TELEGRAM_GLOBAL_RATE", 30))
+    telegram_chat_rate = float(os.getenv("TELEGRAM_CHAT_RATE", 1))
+    telegram_group_rate = float(os.getenv("TELEGRAM_GROUP_RATE", 20))
+    telegram_burst = float(os.getenv("TELEGRAM_BURST", 3))
+    telegram_send_retries = int(os.getenv("TELEGRAM_SEND_RETRIES", 2))
+    wiki_backend = os.getenv("WIKI_BACKEND", "pywikibot").lower()
+    wiki_api_url = os.getenv("WIKI_API_URL", "https://uk.wikipedia.org/w/api.php")
+    wiki_article_url = os.getenv("WIKI_ARTICLE_URL", "https://uk.wikipedia.org/wiki/")
+    wikidata_api_url = os.getenv("WIKIDATA_API_URL", "https://www.wikidata.org/w/api.php")
+    commons_api_url = os.getenv("COMMONS_API_URL", "https://commons.wikimedia.org/w/api.php")
+    http_timeout = float(os.getenv("HTTP_TIMEOUT", 10))
+    http_connect_timeout = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+    http_max_connections = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+    http_max_keepalive = int(os.getenv("HTTP_MAX_KEEPALIVE", 20))
+    http_keepalive_expiry = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 60))
+    http_max_per_host = int(os.getenv("HTTP_MAX_PER_HOST", 20))
+    http_min_per_host = int(os.getenv("HTTP_MIN_PER_HOST", 1))
+    http_retries = int(os.getenv("HTTP_RETRIES", 2))
+    http_retry_after_max = float(os.getenv("HTTP_RETRY_AFTER_MAX", 60))
+    wiki_maxlag = int(os.getenv("WIKI_MAXLAG", 5))
+    file_id_cache_path = os.getenv("FILE_ID_CACHE_PATH", ":memory:")
+    file_id_cache_size = int(os.getenv("FILE_ID_CACHE_SIZE", 10_000))
+    file_id_cache_ttl = int(os.getenv("FILE_ID_CACHE_TTL", 30 * 24 * 60 * 60))
+    fan_out_per_message = int(os.getenv("FAN_OUT_PER_MESSAGE", 4))
+    fan_out_total = int(os.getenv("FAN_OUT_TOTAL", 64))
+    fan_out_backlog = int(os.getenv("FAN_OUT_BACKLOG", 256))
+    search_workers = int(os.getenv("SEARCH_WORKERS", 8))
+    entity_workers = int(os.getenv("ENTITY_WORKERS", 8))
+    extract_workers = int(os.getenv("EXTRACT_WORKERS", 4))
+    commons_workers = int(os.getenv("COMMONS_WORKERS", 4))
+    executor_queue_size = int(os.getenv("EXECUTOR_QUEUE_SIZE", 64))
+    shed_threshold = float(os.getenv("SHED_THRESHOLD", 0.5))
+    item_timeout = float(os.getenv("ITEM_TIMEOUT", 15)) or None
+    response_streaming = os.getenv("RESPONSE_STREAMING", "true").lower() in ["true", "1"]
+    entity_cache_size = int(os.getenv("ENTITY_CACHE_SIZE", 2048))
+    entity_cache_ttl = int(os.getenv("ENTITY_CACHE_TTL", 6 * 60 * 60))
+    morph_cache_size = int(os.getenv("MORPH_CACHE_SIZE", 50_000))
+    genitive_table_path = os.getenv("GENITIVE_TABLE_PATH", None)
+    search_cache_size = int(os.getenv("SEARCH_CACHE_SIZE", 4096))
+    search_cache_ttl = int(os.getenv("SEARCH_CACHE_TTL", 60 * 60))
+    search_negative_ttl = int(os.getenv("SEARCH_NEGATIVE_TTL", 5 * 60))
+    summary_cache_size = int(os.getenv("SUMMARY_CACHE_SIZE", 4096))
+    summary_cache_ttl = int(os.getenv("SUMMARY_CACHE_TTL", 7 * 24 * 60 * 60))
+    recent_changes_url = os.getenv("RECENT_CHANGES_URL", None)
+    recent_changes_read_timeout = float(os.getenv("RECENT_CHANGES_READ_TIMEOUT", 60))
+    recent_changes_reconnect = float(os.getenv("RECENT_CHANGES_RECONNECT", 5))
+    random_pool_low = int(os.getenv("RANDOM_POOL_LOW", 10))
+    random_pool_high = int(os.getenv("RANDOM_POOL_HIGH", 40))
+    random_batch_size = min(int(os.getenv("RANDOM_BATCH_SIZE", 20)), 20)
+    workers = int(os.getenv("WORKERS", 0))
+    worker_max_restarts = int(os.getenv("WORKER_MAX_RESTARTS", 5))
+    shared_cache_path = os.getenv("SHARED_CACHE_PATH", None)
+    api_cache_path = os.getenv("API_CACHE_PATH", None)
+    api_cache_max_bytes = int(float(os.getenv("API_CACHE_MAX_MB", 64)) * 1024 * 1024)
+    api_cache_ttls = os.getenv(
+        "API_CACHE_TTLS",
+        "query+search=3600,query+extracts=3600,query+info=3600,query+revisions=3600,query+pageprops=86400,"
+        "query+pageimages=86400,query+imageinfo=86400,wbgetentities=21600,query+siteinfo=604800,paraminfo=604800",
+    )
+    metrics_listen = os.getenv("METRICS_LISTEN", "127.0.0.1")
+    metrics_port = int(os.getenv("METRICS_PORT", 9090))
+    local_index_path = os.getenv("LOCAL_INDEX_PATH", None)
+    local_index_max_age = float(os.getenv("LOCAL_INDEX_MAX_AGE", 30)) * 24 * 60 * 60 or None
+    titles_path = os.getenv("TITLES_PATH", None)
+    inline_results = int(os.getenv("INLINE_RESULTS", 10))
+    inline_cache_time = int(os.getenv("INLINE_CACHE_TIME", 24 * 60 * 60))
 
-    if telegram_token is None:
-        raise ValueError("Missing TELEGRAM_TOKEN")
-    if not wiki_disable_auth and not all(
-        [wiki_consumer_token, wiki_consumer_secret, wiki_access_token, wiki_access_secret, wiki_username]
-    ):
-        print(wiki_consumer_token, wiki_consumer_secret, wiki_access_token, wiki_access_secret, wiki_username)
-        raise ValueError(
-            "Missing WIKI_CONSUMER_TOKEN, WIKI_CONSUMER_SECRET, WIKI_ACCESS_TOKEN, WIKI_ACCESS_SECRET or WIKI_USERNAME"
-        )
+    def validate(self) -> None:
+        """Check the settings needed to run the bot, called once on startup rather than on import."""
+        if self.telegram_mode not in ["polling", "webhook"]:
+            raise ValueError("TELEGRAM_MODE must be polling or webhook")
+        if self.wiki_backend not in ["pywikibot", "async"]:
+            raise ValueError("WIKI_BACKEND must be pywikibot or async")
+        if self.telegram_token is None:
+            raise ValueError("Missing TELEGRAM_TOKEN")
+        credentials = {
+            "WIKI_CONSUMER_TOKEN": self.wiki_consumer_token,
+            "WIKI_CONSUMER_SECRET": self.wiki_consumer_secret,
+            "WIKI_ACCESS_TOKEN": self.wiki_access_token,
+            "WIKI_ACCESS_SECRET": self.wiki_access_secret,
+            "WIKI_USERNAME": self.wiki_username,
+        }
+        missing = [name for name, value in credentials.items() if not value]
+        if not self.wiki_disable_auth and missing:
+            raise ValueError(f"Missing {', '.join(missing)}")
 
 
 config = Config()
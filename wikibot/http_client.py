@@ -0,0 +1,164 @@
+import logging
+import ssl
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import AsyncIterator, Callable, Dict
+
+from httpx import (
+    AsyncBaseTransport,
+    AsyncByteStream,
+    AsyncClient,
+    AsyncHTTPTransport,
+    Limits,
+    Request,
+    Response,
+    Timeout,
+    create_ssl_context,
+)
+
+from wikibot.concurrency import AdaptiveLimiter
+from wikibot.config import config
+from wikibot.metrics import IN_PROGRESS, QUEUE_DEPTH, UPSTREAM_BACKOFFS, UPSTREAM_LIMIT, UPSTREAM_RESPONSES
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "ukwikibot/0.4.0 (https://t.me/ukwikibot)"
+
+
+class _ReleasingStream(AsyncByteStream):
+    def __init__(self, stream: AsyncByteStream, release: Callable[[], None]):
+        self.stream = stream
+        self.release = release
+        self.released = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self.stream.aclose()
+        finally:
+            if not self.released:
+                self.released = True
+                self.release()
+
+
+def retry_after(response: Response) -> float | None:
+    """Seconds to back off if the response is a 429, a 503 or a maxlag error, None for healthy responses."""
+    maxlag = response.headers.get("mediawiki-api-error") == "maxlag"
+    if response.status_code not in (429, 503) and not maxlag:
+        return None
+    value = response.headers.get("retry-after", "")
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            seconds = 1.0
+    return min(max(seconds, 0.0), config.http_retry_after_max)
+
+
+class HostLimitedTransport(AsyncBaseTransport):
+    """Adapts the number of in-flight requests per host to what the host allows.
+
+    Every host gets its own AdaptiveLimiter, so Wikipedia, Wikidata and Commons have separate budgets.
+    The slot is held until the response is closed. GET requests answered with 429, 503 or maxlag are
+    retried after the Retry-After the host asked for.
+    """
+
+    def __init__(self, transport: AsyncBaseTransport, max_per_host: int, min_per_host: int = 1, retries: int = 0):
+        self.transport = transport
+        self.max_per_host = max_per_host
+        self.min_per_host = min_per_host
+        self.retries = retries
+        self.limiters: Dict[str, AdaptiveLimiter] = {}
+
+    def limiter(self, host: str) -> AdaptiveLimiter:
+        if host not in self.limiters:
+            self.limiters[host] = AdaptiveLimiter(self.max_per_host, self.min_per_host)
+        return self.limiters[host]
+
+    async def handle_async_request(self, request: Request) -> Response:
+        host = request.url.host
+        limiter = self.limiter(host)
+        attempt = 0
+        while True:
+            response = await self._send(request, limiter)
+            backoff = retry_after(response)
+            if backoff is None:
+                limiter.on_success()
+                return self._hold_until_closed(response, host, limiter)
+            UPSTREAM_BACKOFFS.inc(host=host, status=str(response.status_code))
+            if attempt >= self.retries or request.method != "GET":
+                return self._hold_until_closed(response, host, limiter)
+            attempt += 1
+            logger.info(f"{host} answered {response.status_code}, retrying in {backoff:.1f}s")
+            await response.aclose()
+            limiter.release()
+            self._export(host, limiter)
+
+    async def _send(self, request: Request, limiter: AdaptiveLimiter) -> Response:
+        host = request.url.host
+        started = await limiter.acquire()
+        self._export(host, limiter)
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException as e:
+            limiter.release()
+            self._export(host, limiter)
+            UPSTREAM_RESPONSES.inc(host=host, status=type(e).__name__)
+            raise
+        UPSTREAM_RESPONSES.inc(host=host, status=str(response.status_code))
+        if (backoff := retry_after(response)) is not None:
+            limiter.on_congestion(started, backoff)
+        return response
+
+    def _hold_until_closed(self, response: Response, host: str, limiter: AdaptiveLimiter) -> Response:
+        def release():
+            limiter.release()
+            self._export(host, limiter)
+
+        if response.is_closed:
+            release()
+            return response
+        response.stream = _ReleasingStream(response.stream, release)
+        return response
+
+    @staticmethod
+    def _export(host: str, limiter: AdaptiveLimiter) -> None:
+        stats = limiter.stats()
+        UPSTREAM_LIMIT.set(stats["limit"], host=host)
+        QUEUE_DEPTH.set(stats["waiting"], queue=host)
+        IN_PROGRESS.set(stats["in_flight"], queue=host)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+@lru_cache(maxsize=None)
+def shared_ssl_context() -> ssl.SSLContext:
+    """Loading the CA bundle is the slow part of creating a client, so every client shares one context."""
+    return create_ssl_context()
+
+
+def create_http_client() -> AsyncClient:
+    """Long-lived HTTP/2 client shared by the whole application so warm connections are reused."""
+    limits = Limits(
+        max_connections=config.http_max_connections,
+        max_keepalive_connections=config.http_max_keepalive,
+        keepalive_expiry=config.http_keepalive_expiry,
+    )
+    transport = HostLimitedTransport(
+        AsyncHTTPTransport(verify=shared_ssl_context(), http2=True, limits=limits),
+        max_per_host=config.http_max_per_host,
+        min_per_host=config.http_min_per_host,
+        retries=config.http_retries,
+    )
+    return AsyncClient(
+        transport=transport,
+        timeout=Timeout(config.http_timeout, connect=config.http_connect_timeout),
+        headers={"User-Agent": USER_AGENT},
+    )
@@ -0,0 +1,45 @@
+import re
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+class IntentMatcher:
+    """Finds the highest priority intent of a message in a single regex pass.
+
+    Every pattern is wrapped in a zero-width lookahead and joined into one alternation ordered by
+    priority, so one scan reports, for each position, the best intent matching there. Messages that
+    contain none of the intent keywords are rejected before the regex runs at all.
+    """
+
+    def __init__(
+        self,
+        patterns: Iterable[Tuple[Any, str]],
+        contains: Dict[str, Any],
+        keywords: Dict[Any, Tuple[str, ...]],
+        flags: int = re.IGNORECASE,
+    ):
+        self.patterns = [(intent, re.compile(regex, flags)) for intent, regex in patterns]
+        self.contains = contains
+        self.keywords = tuple({keyword.lower() for intent, _ in self.patterns for keyword in keywords[intent]})
+        self.combined = re.compile(
+            "|".join(f"(?=(?P<i{index}>{regex.pattern}))" for index, (_, regex) in enumerate(self.patterns)),
+            flags,
+        )
+        self.group_index = {f"i{index}": index for index in range(len(self.patterns))}
+
+    def match(self, message: str) -> Tuple[Any, List[str] | None] | None:
+        lowered = message.lower()
+        if any(keyword in lowered for keyword in self.keywords):
+            best = None
+            for match in self.combined.finditer(message):
+                index = self.group_index[match.lastgroup]
+                if best is None or index < best:
+                    best = index
+                    if best == 0:
+                        break
+            if best is not None:
+                intent, regex = self.patterns[best]
+                return intent, regex.findall(message)
+        for key, value in self.contains.items():
+            if key in message:
+                return value, None
+        return None
@@ -0,0 +1,189 @@
+import argparse
+import bz2
+import gzip
+import json
+import logging
+import re
+import sqlite3
+import time
+import xml.etree.ElementTree as ElementTree
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROPERTIES = ("P21", "P569", "P570", "P625", "P18", "P373", "P101")
+VALUE_FIELDS = ("id", "time", "calendarmodel", "latitude", "longitude")
+LABELLED_PROPERTIES = ("P101",)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS pages (
+    title_key TEXT PRIMARY KEY, title TEXT NOT NULL, qid TEXT, extract TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS entities (qid TEXT PRIMARY KEY, claims TEXT NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS labels (qid TEXT PRIMARY KEY, label TEXT NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS referenced (qid TEXT PRIMARY KEY) WITHOUT ROWID;
+"""
+
+
+def title_key(title: str) -> str:
+    return " ".join(title.replace("_", " ").split()).casefold()
+
+
+def open_dump(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_wikidata_entities(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream entities from a Wikidata JSON dump, which holds one entity per line inside a JSON array."""
+    with open_dump(path) as f:
+        for line in f:
+            line = line.strip().rstrip(",")
+            if line and line not in ("[", "]"):
+                yield json.loads(line)
+
+
+def iter_abstracts(path: str) -> Iterator[Tuple[str, str]]:
+    """Stream (title, abstract) pairs from a ukwiki abstract XML dump."""
+    with open_dump(path) as f:
+        for _, element in ElementTree.iterparse(f):
+            if element.tag != "doc":
+                continue
+            title = re.sub(r"^[^:]+:\s*", "", element.findtext("title") or "", count=1)
+            abstract = (element.findtext("abstract") or "").strip()
+            if title and abstract:
+                yield title, abstract
+            element.clear()
+
+
+def compact_claims(entity: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Keep only the datavalues of the properties the bot answers from."""
+    claims = {}
+    for prop in PROPERTIES:
+        values = []
+        for claim in entity.get("claims", {}).get(prop, []):
+            value = claim.get("mainsnak", {}).get("datavalue", {}).get("value")
+            if isinstance(value, dict):
+                value = {k: v for k, v in value.items() if k in VALUE_FIELDS}
+            if value is not None:
+                values.append(value)
+        if values:
+            claims[prop] = values
+    return claims
+
+
+class LocalIndexBuilder:
+    def __init__(self, path: str, batch_size: int = 10_000):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        self.batch_size = batch_size
+
+    def add_wikidata(self, entities: Iterable[Dict[str, Any]]) -> int:
+        count = 0
+        pages, claims, labels, referenced = [], [], [], []
+        for entity in entities:
+            qid = entity.get("id")
+            if label := entity.get("labels", {}).get("uk", {}).get("value"):
+                labels.append((qid, label))
+            title = entity.get("sitelinks", {}).get("ukwiki", {}).get("title")
+            if title:
+                compact = compact_claims(entity)
+                pages.append((title_key(title), title, qid))
+                claims.append((qid, json.dumps(compact, ensure_ascii=False, separators=(",", ":"))))
+                for prop in LABELLED_PROPERTIES:
+                    referenced.extend((value["id"],) for value in compact.get(prop, []) if "id" in value)
+                count += 1
+            if len(labels) + len(pages) >= self.batch_size:
+                self._flush(pages, claims, labels, referenced)
+                pages, claims, labels, referenced = [], [], [], []
+        self._flush(pages, claims, labels, referenced)
+        return count
+
+    def _flush(self, pages, claims, labels, referenced) -> None:
+        self.connection.executemany(
+            "INSERT INTO pages (title_key, title, qid) VALUES (?, ?, ?) "
+            "ON CONFLICT (title_key) DO UPDATE SET title = excluded.title, qid = excluded.qid",
+            pages,
+        )
+        self.connection.executemany("INSERT OR REPLACE INTO entities (qid, claims) VALUES (?, ?)", claims)
+        self.connection.executemany("INSERT OR REPLACE INTO labels (qid, label) VALUES (?, ?)", labels)
+        self.connection.executemany("INSERT OR IGNORE INTO referenced (qid) VALUES (?)", referenced)
+        self.connection.commit()
+
+    def add_abstracts(self, abstracts: Iterable[Tuple[str, str]]) -> int:
+        count = 0
+        for title, abstract in abstracts:
+            cursor = self.connection.execute(
+                "UPDATE pages SET extract = ? WHERE title_key = ?", (abstract, title_key(title))
+            )
+            count += cursor.rowcount
+        self.connection.commit()
+        return count
+
+    def finish(self) -> None:
+        """Drop labels nobody refers to and record the build time."""
+        self.connection.execute("DELETE FROM labels WHERE qid NOT IN (SELECT qid FROM referenced)")
+        self.connection.execute("DELETE FROM referenced")
+        self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('built_at', ?)", (str(time.time()),))
+        self.connection.commit()
+        self.connection.execute("VACUUM")
+        self.connection.close()
+
+
+class LocalIndex:
+    """Read-only view of an index built from dumps, consulted before the API."""
+
+    def __init__(self, path: str, max_age: float | None = None):
+        self.connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'built_at'").fetchone()
+        self.built_at = float(row[0]) if row else 0.0
+        self.max_age = max_age
+
+    @property
+    def stale(self) -> bool:
+        return self.max_age is not None and time.time() - self.built_at > self.max_age
+
+    def page(self, title: str) -> Tuple[str, str | None, str | None] | None:
+        """Return (title, qid, extract) of an indexed page."""
+        if self.stale:
+            return None
+        return self.connection.execute(
+            "SELECT title, qid, extract FROM pages WHERE title_key = ?", (title_key(title),)
+        ).fetchone()
+
+    def claims(self, qid: str) -> Dict[str, List[Any]] | None:
+        if self.stale:
+            return None
+        row = self.connection.execute("SELECT claims FROM entities WHERE qid = ?", (qid,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def labels(self, qids: List[str]) -> Dict[str, str]:
+        if not qids:
+            return {}
+        placeholders = ",".join("?" * len(qids))
+        rows = self.connection.execute(f"SELECT qid, label FROM labels WHERE qid IN ({placeholders})", qids)
+        return dict(rows.fetchall())
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the local index of uk-wiki titles and Wikidata facts")
+    parser.add_argument("output", help="path of the SQLite index")
+    parser.add_argument("--wikidata", required=True, help="Wikidata JSON dump (.json, .json.gz or .json.bz2)")
+    parser.add_argument("--abstracts", help="ukwiki abstract XML dump (.xml, .xml.gz or .xml.bz2)")
+    args = parser.parse_args()
+    builder = LocalIndexBuilder(args.output)
+    pages = builder.add_wikidata(iter_wikidata_entities(args.wikidata))
+    extracts = builder.add_abstracts(iter_abstracts(args.abstracts)) if args.abstracts else 0
+    builder.finish()
+    print(f"Indexed {pages} pages, {extracts} extracts into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
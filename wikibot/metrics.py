@@ -0,0 +1,220 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from wikibot.server import Request, Response
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Intent of the message being answered, inherited by every task the handler starts
+current_intent: ContextVar[str] = ContextVar("current_intent", default="none")
+
+LabelValues = Tuple[str, ...]
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def format_labels(names: Tuple[str, ...], values: LabelValues) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def label_values(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{name}{labels} {format_value(value)}" for name, labels, value in self.samples())
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self.label_values(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set_total(self, value: float, **labels: str) -> None:
+        """Mirror a running total kept elsewhere, such as the hits of a cache, instead of incrementing."""
+        key = self.label_values(labels)
+        with self._lock:
+            self.values[key] = value
+
+    def get(self, **labels: str) -> float:
+        return self.values.get(self.label_values(labels), 0)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        with self._lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            yield self.name, format_labels(self.labels, key), value
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self.label_values(labels)
+        with self._lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self.values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self.label_values(labels)
+        with self._lock:
+            counts, total = self.values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def count(self, **labels: str) -> int:
+        counts, _ = self.values.get(self.label_values(labels), ([0], [0.0]))
+        return sum(counts)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        with self._lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self.values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = format_labels(self.labels + ("le",), key + (format_value(bound),))
+                yield f"{self.name}_bucket", labels, cumulative
+            yield f"{self.name}_sum", format_labels(self.labels, key), total
+            yield f"{self.name}_count", format_labels(self.labels, key), cumulative
+
+
+class Registry:
+    """Holds the metrics of the process and renders them in the Prometheus text format.
+
+    Collectors are called before every render to refresh gauges that are cheaper to read on demand,
+    such as queue depths and cache statistics.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Tuple[str, ...] = (), **kwargs) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, **kwargs))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self.collectors:
+            collector()
+        return "\n".join(line for metric in self.metrics.values() for line in metric.render()) + "\n"
+
+    async def handle(self, _: Request) -> Response:
+        return Response(200, self.render().encode(), content_type=CONTENT_TYPE)
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    "ukwikibot_stage_seconds", "Time spent in each stage of answering a message", ("stage", "intent", "outcome")
+)
+MESSAGES = registry.counter("ukwikibot_messages_total", "Messages handled", ("intent", "outcome"))
+UPSTREAM_RESPONSES = registry.counter(
+    "ukwikibot_upstream_responses_total", "Upstream HTTP responses by host and status", ("host", "status")
+)
+UPSTREAM_BACKOFFS = registry.counter(
+    "ukwikibot_upstream_backoffs_total",
+    "429, 503 and maxlag answers that shrank the upstream limit",
+    ("host", "status"),
+)
+UPSTREAM_LIMIT = registry.gauge("ukwikibot_upstream_limit", "Allowed in-flight requests per upstream host", ("host",))
+TELEGRAM_REQUESTS = registry.counter("ukwikibot_telegram_requests_total", "Telegram send requests", ("method",))
+TELEGRAM_REPLIES = registry.counter(
+    "ukwikibot_telegram_replies_total", "Replies sent, several can share a request", ("method",)
+)
+QUEUE_DEPTH = registry.gauge("ukwikibot_queue_depth", "Work waiting to be started", ("queue",))
+IN_PROGRESS = registry.gauge("ukwikibot_in_progress", "Work started and not finished yet", ("queue",))
+REJECTED = registry.counter("ukwikibot_rejected_total", "Work refused because its queue was full", ("queue",))
+COALESCED = registry.counter(
+    "ukwikibot_coalesced_total", "Calls that waited for an identical call in flight instead of starting their own"
+)
+CACHE_REQUESTS = registry.counter("ukwikibot_cache_requests_total", "Cache lookups", ("cache", "result"))
+CACHE_SIZE = registry.gauge("ukwikibot_cache_size", "Entries held by each cache", ("cache",))
+CACHE_HIT_RATE = registry.gauge("ukwikibot_cache_hit_rate", "Share of cache lookups that were hits", ("cache",))
+
+
+class timed:
+    """Observe the duration of a block in ``ukwikibot_stage_seconds``.
+
+    The outcome is "error" when the block raises, otherwise "ok" unless the block sets another one.
+    """
+
+    def __init__(self, stage: str, intent: str | None = None):
+        self.stage = stage
+        self.intent = intent
+        self.outcome = "ok"
+        self.started = 0.0
+
+    def __enter__(self) -> "timed":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.outcome = "error"
+        STAGE_SECONDS.observe(
+            time.perf_counter() - self.started,
+            stage=self.stage,
+            intent=self.intent or current_intent.get(),
+            outcome=self.outcome,
+        )
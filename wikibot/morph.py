@@ -0,0 +1,164 @@
+import argparse
+import logging
+import mmap
+import struct
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Iterator, Tuple
+
+import pymorphy3
+
+from wikibot.cache import MISSING, TTLCache
+
+logger = logging.getLogger(__name__)
+
+TABLE_MAGIC = b"UKGEN\x00\x00\x01"
+HEADER = struct.Struct("<8sI")
+OFFSET = struct.Struct("<I")
+
+
+class GenitiveTable:
+    """Sorted word -> nominative table read through mmap, covering every word the analyzer knows.
+
+    Layout: header (magic, count), count + 1 little-endian uint32 offsets into the data block,
+    then the data block with "word\\tnominative" UTF-8 records sorted by word. Words without a
+    genitive reading have an empty nominative, so they are known without being analyzed.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self.buffer, 0)
+        if magic != TABLE_MAGIC:
+            raise ValueError(f"{path} is not a genitive table")
+        self.data_start = HEADER.size + OFFSET.size * (self.count + 1)
+
+    def _record(self, index: int) -> Tuple[bytes, bytes]:
+        start, end = struct.unpack_from("<2I", self.buffer, HEADER.size + OFFSET.size * index)
+        key, _, value = self.buffer[self.data_start + start : self.data_start + end].partition(b"\t")
+        return key, value
+
+    def get(self, word: str) -> str | None:
+        """The nominative of a genitive word, "" for a known word that is not genitive, None if unknown."""
+        key = word.encode()
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            record_key, value = self._record(middle)
+            if record_key < key:
+                low = middle + 1
+            elif record_key > key:
+                high = middle
+            else:
+                return value.decode()
+        return None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self.buffer.close()
+
+    @staticmethod
+    def write(path: str, items: Iterable[Tuple[str, str]]) -> int:
+        records = sorted((key.encode(), value.encode()) for key, value in items)
+        offsets = [0]
+        for key, value in records:
+            offsets.append(offsets[-1] + len(key) + 1 + len(value))
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(TABLE_MAGIC, len(records)))
+            f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+            for key, value in records:
+                f.write(key + b"\t" + value)
+        return len(records)
+
+
+@dataclass
+class LemmatizerStats:
+    table_hits: int
+    cache_hits: int
+    analyzer_calls: int
+    cache_size: int
+
+
+@lru_cache(maxsize=None)
+def shared_analyzer() -> pymorphy3.MorphAnalyzer:
+    """One analyzer per process, loading its dictionaries is the slow part of startup."""
+    return pymorphy3.MorphAnalyzer(lang="uk")
+
+
+class GenitiveLemmatizer:
+    """Finds the nominative form of a word that may be in genitive case.
+
+    Results are memoised per word, and an optional precomputed table answers every known word
+    without touching the analyzer, only words missing from it are analyzed.
+    """
+
+    def __init__(
+        self, morph: pymorphy3.MorphAnalyzer | None = None, table: GenitiveTable | None = None, maxsize: int = 50_000
+    ):
+        self._morph = morph
+        self.table = table
+        self.cache = TTLCache(maxsize=maxsize, ttl=None)
+        self.table_hits = 0
+        self.analyzer_calls = 0
+
+    @property
+    def morph(self) -> pymorphy3.MorphAnalyzer:
+        if self._morph is None:
+            self._morph = shared_analyzer()
+        return self._morph
+
+    def analyze(self, word: str) -> str | None:
+        for w in reversed(self.morph.parse(word)):
+            if w.tag and w.tag.case == "gent":
+                return w.normal_form
+        return None
+
+    def nominative(self, word: str) -> str | None:
+        key = word.lower()
+        result = self.cache.get(key)
+        if result is not MISSING:
+            return result
+        if self.table is not None and (entry := self.table.get(key)) is not None:
+            self.table_hits += 1
+            result = entry or None
+        else:
+            self.analyzer_calls += 1
+            result = self.analyze(key)
+        self.cache.set(key, result)
+        return result
+
+    def stats(self) -> LemmatizerStats:
+        cache_stats = self.cache.stats()
+        return LemmatizerStats(
+            table_hits=self.table_hits,
+            cache_hits=cache_stats.hits,
+            analyzer_calls=self.analyzer_calls,
+            cache_size=cache_stats.size,
+        )
+
+
+def iter_table_entries(lemmatizer: GenitiveLemmatizer, words: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    for word in words:
+        yield word, lemmatizer.analyze(word) or ""
+
+
+def build_genitive_table(path: str, morph: pymorphy3.MorphAnalyzer, words: Iterable[str] | None = None) -> int:
+    """Build the table from the given words or from every word known to the analyzer dictionary."""
+    if words is None:
+        words = {parse.word for parse in morph.iter_known_word_parses()}
+    lemmatizer = GenitiveLemmatizer(morph)
+    return GenitiveTable.write(path, iter_table_entries(lemmatizer, words))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the precomputed genitive -> nominative table")
+    parser.add_argument("output", help="path of the table file")
+    args = parser.parse_args()
+    count = build_genitive_table(args.output, shared_analyzer())
+    print(f"Wrote {count} records to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
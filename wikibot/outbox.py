@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Deque, Dict, List
+
+from telegram import Chat, InputMediaPhoto, Message
+from telegram.constants import MessageLimit, ParseMode
+from telegram.error import BadRequest, RetryAfter
+
+from wikibot.cache import MISSING, TTLCache
+from wikibot.concurrency import TokenBucket
+from wikibot.config import config
+from wikibot.metrics import STAGE_SECONDS, TELEGRAM_REPLIES, TELEGRAM_REQUESTS, current_intent
+from wikibot.storage import FileIdCache
+
+logger = logging.getLogger(__name__)
+
+MEDIA_GROUP_SIZE = 10
+SEPARATOR = "\n\n"
+
+
+@dataclass
+class Reply:
+    message: Message
+    kind: str
+    content: Any
+    caption: str | None = None
+    image_url: str | None = None
+    options: Dict[str, Any] = field(default_factory=dict)
+    intent: str = field(default_factory=current_intent.get)
+    queued: float = field(default_factory=time.perf_counter)
+    future: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+    def joins(self, other: "Reply") -> bool:
+        return self.kind == other.kind and self.message is other.message and self.options == other.options
+
+
+class Outbox:
+    """Queue of replies per chat, sent within Telegram's global and per-chat rate limits.
+
+    Every chat gets a worker while it has replies waiting. Text replies to the same message that queue
+    up behind each other are merged into one message of at most 4096 characters, photos into one
+    media group. The returned futures resolve once the reply is sent. Photos sent by a cached file_id that
+    Telegram rejects are downloaded with ``download`` and uploaded again.
+    """
+
+    def __init__(
+        self,
+        file_ids: FileIdCache | None = None,
+        download: Callable[[str], Awaitable[bytes | None]] | None = None,
+    ):
+        self.file_ids = file_ids
+        self.download = download
+        self.queues: Dict[int, Deque[Reply]] = {}
+        self.workers: Dict[int, asyncio.Task] = {}
+        self.global_bucket = TokenBucket(config.telegram_global_rate, config.telegram_global_rate)
+        # A bucket left alone for a minute is full again, so idle chats need not be remembered
+        self.chat_buckets = TTLCache(maxsize=100_000, ttl=60)
+
+    @property
+    def pending(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def submit(self, reply: Reply) -> asyncio.Future:
+        chat_id = reply.message.chat_id
+        self.queues.setdefault(chat_id, deque()).append(reply)
+        if chat_id not in self.workers:
+            self.workers[chat_id] = asyncio.ensure_future(self._drain(chat_id))
+        return reply.future
+
+    def reply_text(self, message: Message, text: str, **options: Any) -> asyncio.Future:
+        return self.submit(Reply(message, "text", text, options=options))
+
+    def reply_photo(self, message: Message, image: bytes | str, caption: str | None, image_url: str | None):
+        return self.submit(Reply(message, "photo", image, caption=caption, image_url=image_url))
+
+    def reply_location(self, message: Message, latitude: float, longitude: float) -> asyncio.Future:
+        return self.submit(Reply(message, "location", (latitude, longitude)))
+
+    async def _drain(self, chat_id: int) -> None:
+        queue = self.queues[chat_id]
+        try:
+            while queue:
+                await self._send(self._take(queue))
+        finally:
+            for reply in queue:
+                reply.future.cancel()
+            del self.queues[chat_id]
+            del self.workers[chat_id]
+
+    @staticmethod
+    def _take(queue: Deque[Reply]) -> List[Reply]:
+        """Take the next reply and the ones queued behind it that can go out in the same request."""
+        batch = [queue.popleft()]
+        while queue and batch[0].joins(queue[0]) and Outbox._fits(batch, queue[0]):
+            batch.append(queue.popleft())
+        return batch
+
+    @staticmethod
+    def _fits(batch: List[Reply], reply: Reply) -> bool:
+        if reply.kind == "text":
+            length = sum(len(queued.content) + len(SEPARATOR) for queued in batch) + len(reply.content)
+            return length <= MessageLimit.MAX_TEXT_LENGTH
+        return reply.kind == "photo" and len(batch) < MEDIA_GROUP_SIZE
+
+    def chat_bucket(self, chat: Chat) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat.id)
+        if bucket is MISSING:
+            private = chat.type == Chat.PRIVATE
+            rate = config.telegram_chat_rate if private else config.telegram_group_rate / 60
+            bucket = TokenBucket(rate, config.telegram_burst)
+        self.chat_buckets.set(chat.id, bucket)
+        return bucket
+
+    async def _send(self, batch: List[Reply]) -> None:
+        await self.chat_bucket(batch[0].message.chat).acquire(len(batch) if batch[0].kind == "photo" else 1)
+        await self.global_bucket.acquire()
+        sent = time.perf_counter()
+        for reply in batch:
+            STAGE_SECONDS.observe(sent - reply.queued, stage="send_queue", intent=reply.intent, outcome="ok")
+        try:
+            results = await self._deliver(batch)
+        except Exception as e:  # noqa
+            for reply in batch:
+                if not reply.future.done():
+                    reply.future.set_exception(e)
+            return
+        for reply, result in zip(batch, results):
+            if not reply.future.done():
+                reply.future.set_result(result)
+
+    async def _deliver(self, batch: List[Reply]) -> List[Any]:
+        for attempt in range(config.telegram_send_retries + 1):
+            try:
+                return await self._request(batch)
+            except RetryAfter as e:
+                if attempt == config.telegram_send_retries:
+                    raise
+                delay = e.retry_after.total_seconds() if isinstance(e.retry_after, timedelta) else e.retry_after
+                logger.warning(f"Flood limit in chat {batch[0].message.chat_id}, retrying in {delay}s")
+                await asyncio.sleep(delay)
+
+    async def _request(self, batch: List[Reply]) -> List[Any]:
+        first = batch[0]
+        method = "media_group" if first.kind == "photo" and len(batch) > 1 else first.kind
+        TELEGRAM_REQUESTS.inc(method=method)
+        TELEGRAM_REPLIES.inc(len(batch), method=method)
+        if first.kind == "text":
+            text = SEPARATOR.join(reply.content for reply in batch)
+            message = await first.message.reply_text(text, parse_mode=ParseMode.HTML, **first.options)
+            return [message] * len(batch)
+        if first.kind == "location":
+            return [await first.message.reply_location(*first.content)]
+        return await self._send_photos(batch)
+
+    async def _send_photos(self, batch: List[Reply], reupload: bool = True) -> List[Any]:
+        first = batch[0]
+        try:
+            if len(batch) == 1:
+                messages = [
+                    await first.message.reply_photo(first.content, caption=first.caption, parse_mode=ParseMode.HTML)
+                ]
+            else:
+                media = [InputMediaPhoto(r.content, caption=r.caption, parse_mode=ParseMode.HTML) for r in batch]
+                messages = list(await first.message.reply_media_group(media))
+        except BadRequest:
+            stale = [reply for reply in batch if reply.image_url and isinstance(reply.content, str)]
+            self._discard_file_ids(stale)
+            if not (reupload and stale and await self._download(stale)):
+                raise
+            return await self._send_photos(batch, reupload=False)
+        self._remember_file_ids(batch, messages)
+        return messages
+
+    def _discard_file_ids(self, replies: List[Reply]) -> None:
+        for reply in replies:
+            if self.file_ids is not None:
+                logger.warning(f"Cached file_id for {reply.image_url} was rejected")
+                self.file_ids.discard(reply.image_url)
+
+    async def _download(self, replies: List[Reply]) -> bool:
+        """Replace rejected file_ids with the image itself, False if one of them cannot be downloaded."""
+        if self.download is None:
+            return False
+        for reply in replies:
+            if (content := await self.download(reply.image_url)) is None:
+                return False
+            reply.content = content
+        return True
+
+    def _remember_file_ids(self, batch: List[Reply], messages: List[Message]) -> None:
+        """Remember the file_id Telegram assigns to new uploads."""
+        for reply, message in zip(batch, messages):
+            if self.file_ids is not None and reply.image_url and isinstance(reply.content, bytes) and message.photo:
+                self.file_ids.set(reply.image_url, message.photo[-1].file_id)
@@ -1,12 +1,29 @@
+import asyncio
 import logging
-import re
 from enum import Enum
-from typing import Any, List, Tuple
+from typing import Any, AsyncIterator, List, Tuple
 from urllib.parse import unquote
 
 from httpx import AsyncClient
 
-from wikibot.wiki import WikiManager
+from wikibot.concurrency import Overloaded
+from wikibot.config import config
+from wikibot.http_client import create_http_client
+from wikibot.intents import IntentMatcher
+from wikibot.metrics import (
+    CACHE_HIT_RATE,
+    CACHE_REQUESTS,
+    CACHE_SIZE,
+    COALESCED,
+    IN_PROGRESS,
+    QUEUE_DEPTH,
+    REJECTED,
+    current_intent,
+    timed,
+)
+from wikibot.storage import FileIdCache
+from wikibot.titles import title_id
+from wikibot.wiki import BaseWikiManager, create_wiki_manager
 
 logger = logging.getLogger(__name__)
 
@@ -74,6 +91,18 @@ class MessageParser:
         (Messages.UKWIKIBOT, r"@ukwikibot"),
     ]
 
+    KEYWORDS = {
+        Messages.WHATIS: ("о таке ", "хто так"),
+        Messages.LINK: ("[[",),
+        Messages.BIRTHDAY: ("коли народи", "дата народження "),
+        Messages.DEATHDAY: ("коли помер", "дата смерті "),
+        Messages.FIELD_OF_WORK: ("@ukwikibot",),
+        Messages.COORDS: ("де розташован", "де знаходиться "),
+        Messages.COORDS_GEN: ("координати ",),
+        Messages.IMAGE: ("знайди ", "покажи "),
+        Messages.UKWIKIBOT: ("@ukwikibot",),
+    }
+
     COMMANDS = {
         "help": Messages.HELP,
         "start": Messages.HELP,
@@ -85,20 +114,50 @@ class MessageParser:
         "@ukwikibot": Messages.UKWIKIBOT,
     }
 
-    def __init__(self) -> None:
-        self.wiki_manager = WikiManager()
-        self.wiki_manager.login()
-        self.regex_match = [
-            (message_group, re.compile(regex, re.IGNORECASE)) for message_group, regex in self.REGEXES_MATCH
-        ]
+    # Answers that need neither the analyzer nor the wiki session, they do not wait for the warm-up
+    NO_WARM_UP = {Messages.HELP, Messages.WIKI, Messages.UKWIKIBOT, Messages.LINK}
+
+    def __init__(self, http_client: AsyncClient | None = None, wiki_manager: BaseWikiManager | None = None) -> None:
+        self.http_client = http_client or create_http_client()
+        self.wiki_manager = wiki_manager or create_wiki_manager(self.http_client)
+        self.fan_out = self.wiki_manager.fan_out
+        self.file_ids = (
+            FileIdCache(config.file_id_cache_path, config.file_id_cache_size, config.file_id_cache_ttl)
+            if config.file_id_cache_path
+            else None
+        )
+        self._warm_up: asyncio.Future | None = None
+        self.intent_matcher = IntentMatcher(self.REGEXES_MATCH, self.CONTAINS, self.KEYWORDS)
+
+    def start_warm_up(self) -> asyncio.Future:
+        """Start loading the analyzer and connecting to the wiki in the background, once."""
+        if self._warm_up is None:
+            self._warm_up = asyncio.ensure_future(self.wiki_manager.warm_up())
+            self._warm_up.add_done_callback(self._warm_up_done)
+        return self._warm_up
+
+    def _warm_up_done(self, future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is None:
+            logger.info("Message parser is ready")
+            return
+        if not future.cancelled():
+            logger.error(f"Warm-up failed, the next message retries it: {future.exception()!r}")
+        if self._warm_up is future:
+            self._warm_up = None
+
+    @property
+    def ready(self) -> bool:
+        return self._warm_up is not None and self._warm_up.done()
+
+    async def wait_ready(self) -> None:
+        """Readiness gate for answers that need the analyzer or the wiki."""
+        await asyncio.shield(self.start_warm_up())
 
     async def get_matches(self, message: str) -> Tuple[Messages, List[str] | None]:
-        for message_type, pattern in self.regex_match:
-            if matches := re.findall(pattern, message):
-                return message_type, matches
-        for key, value in self.CONTAINS.items():
-            if key in message:
-                return value, None
+        with timed("match") as timer:
+            response = self.intent_matcher.match(message)
+            timer.intent = response[0].value[0] if response else "none"
+        return response
 
     async def get_ukwikibot_message(self, *args):
         yield "Га?"
@@ -112,88 +171,191 @@ class MessageParser:
     async def get_wiki_command(self):
         return "https://uk.wikipedia.org/"
 
-    async def get_image_message(self, matches):
-        for match in matches:
-            image_url, description_url, commons_category = await self.wiki_manager.get_images_genitive(match)
+    async def found_pages(self, matches, genitive=False, entities=True):
+        return [page for page in await self.wiki_manager.lookup(matches, genitive, entities) if page is not None]
+
+    async def download_image(self, image_url: str) -> bytes | None:
+        response = await self.http_client.get(image_url)
+        if response.status_code == 200 and response.headers.get("content-type") == "image/jpeg":
+            return response.content
+        return None
+
+    async def get_image_answer(self, page):
+        with timed("image") as timer:
+            image_url, description_url, commons_category = await self.wiki_manager.get_page_image_info(page)
             description_message = ""
             content = None
             if image_url and description_url:
                 description_message += f'<a href="{description_url}">Автор та ліцензія.</a> Дивіться також'
-                async with AsyncClient() as client:
-                    response = await client.get(image_url)
-                    if response.status_code == 200 and response.headers.get("content-type") == "image/jpeg":
-                        content = response.content
-            if commons_category:
-                description_message = (
-                    f"{description_message or 'Основне фото не знайдено. Дивіться'} фото в категорії "
-                    f'<a href="https://commons.wikimedia.org/wiki/Category:{commons_category}">'
-                    f"«{commons_category}»"
-                    f"</a> на Вікісховищі"
-                )
-            yield content, description_message or None
+                content = self.file_ids.get(image_url) if self.file_ids is not None else None
+                if content is None:
+                    content = await self.download_image(image_url)
+                else:
+                    timer.outcome = "file_id"
+            if content is None:
+                timer.outcome = "no_image"
+        if commons_category:
+            description_message = (
+                f"{description_message or 'Основне фото не знайдено. Дивіться'} фото в категорії "
+                f'<a href="https://commons.wikimedia.org/wiki/Category:{commons_category}">'
+                f"«{commons_category}»"
+                f"</a> на Вікісховищі"
+            )
+        return content, description_message or None, image_url
+
+    async def get_image_message(self, matches):
+        async for image in self.fan_out.map(self.get_image_answer, await self.found_pages(matches, genitive=True)):
+            yield image
+
+    async def get_birthday_answer(self, page):
+        gender, date = await asyncio.gather(self.wiki_manager.get_gender(page), self.wiki_manager.get_birthday(page))
+        w = "народилась" if gender == "female" else "народився"
+        if date:
+            return f"{page.title()} {w} {date}"
 
     async def get_birthday_message(self, matches):
-        for match in matches:
-            page = await self.wiki_manager.search_page(match)
-            gender = await self.wiki_manager.get_gender(page)
-            date = await self.wiki_manager.get_birthday(page)
-            w = "народилась" if gender == "female" else "народився"
-            if date:
-                yield f"{page.title()} {w} {date}"
+        async for message in self.fan_out.map(self.get_birthday_answer, await self.found_pages(matches)):
+            if message:
+                yield message
 
     async def get_coords_gen_message(self, matches):
-        for match in matches:
-            page = await self.wiki_manager.genitive_search(match)
-            yield await self.wiki_manager.get_coords(page)
+        pages = await self.found_pages(matches, genitive=True)
+        async for coords in self.fan_out.map(self.wiki_manager.get_coords, pages):
+            yield coords
 
     async def get_coords_message(self, matches):
-        for match in matches:
-            page = await self.wiki_manager.search_page(match)
-            yield await self.wiki_manager.get_coords(page)
+        async for coords in self.fan_out.map(self.wiki_manager.get_coords, await self.found_pages(matches)):
+            yield coords
+
+    async def get_deathday_answer(self, page):
+        gender, date = await asyncio.gather(self.wiki_manager.get_gender(page), self.wiki_manager.get_deathday(page))
+        if date:
+            return f"{page.title()} помер{'ла' if gender == 'female' else ''} {date}"
 
     async def get_deathday_message(self, matches):
-        for match in matches:
-            page = await self.wiki_manager.search_page(match)
-            gender = await self.wiki_manager.get_gender(page)
-            date = await self.wiki_manager.get_deathday(page)
-            if date:
-                yield f"{page.title()} помер{'ла' if gender == 'female' else ''} {date}"
+        async for message in self.fan_out.map(self.get_deathday_answer, await self.found_pages(matches)):
+            if message:
+                yield message
+
+    async def get_link_answer(self, url):
+        url = f"{config.wiki_article_url}{url.replace(' ', '_')}"
+        with timed("link") as timer:
+            response = await self.http_client.get(url, follow_redirects=True)
+            timer.outcome = "not_found" if response.status_code == 404 else "ok"
+        if response.status_code != 404:
+            return unquote(str(response.url))
+        logger.info(f"Error while fetching {url}. Status code: {response.status_code}")
 
     async def get_link_message(self, matches):
-        async with AsyncClient(http2=True) as client:
-            for url in matches:
-                url = f"https://uk.wikipedia.org/wiki/{url.replace(' ', '_')}"
-                response = await client.get(url, follow_redirects=True, timeout=10)
-                if response.status_code != 404:
-                    yield unquote(str(response.url))
-                else:
-                    logger.info(f"Error while fetching {url}. Status code: {response.status_code}")
+        async for link in self.fan_out.map(self.get_link_answer, matches):
+            if link:
+                yield link
 
     async def get_whatis_message(self, matches):
-        for query in matches:
-            yield await self.wiki_manager.search(query)
+        pages = await self.wiki_manager.lookup(matches, entities=False)
+        async for summary in self.fan_out.map(self.wiki_manager.get_page_summary, pages):
+            yield summary
+
+    async def get_field_of_work_answer(self, page):
+        value = ", ".join(await self.wiki_manager.get_wikidata_text(page, "P101"))
+        logger.debug(f"{page} - {value}")
+        return value
 
     async def get_field_of_work_message(self, matches):
-        for query in matches:
-            value = await self.wiki_manager.get_field_of_work(page=query)
-            logger.debug(f"{query} - {value}")
+        pages = await self.found_pages(matches, genitive=True)
+        async for value in self.fan_out.map(self.get_field_of_work_answer, pages):
             if value:
                 yield value
 
     async def get_command_response(self, message: str) -> str:
         message_name, message_type = self.COMMANDS[message].value
+        if self.COMMANDS[message] not in self.NO_WARM_UP:
+            await self.wait_ready()
         func = getattr(self, f"get_{message_name}_command")
         return await func()
 
-    async def get_response(self, message: str) -> Tuple[List[Any] | None, MessageTypes | None]:
+    def get_suggestions(self, query: str, offset: int = 0) -> List[Tuple[str, str]]:
+        """(result id, title) pairs starting with an inline query, an empty list until the title index is loaded."""
+        titles = self.wiki_manager.titles
+        if titles is None:
+            return []
+        with timed("suggest", intent="inline"):
+            return [(title_id(title), title) for title in titles.complete(query, config.inline_results, offset)]
+
+    async def get_suggestion_summary(self, result_id: str) -> str | None:
+        """The same summary a search for the chosen title answers with."""
+        titles = self.wiki_manager.titles
+        title = titles.title(result_id) if titles is not None else None
+        if title is None:
+            return None
+        current_intent.set("inline")
+        await self.wait_ready()
+        return await self.wiki_manager.search(title)
+
+    @staticmethod
+    def low_priority(message_group: Messages, matches: List[str] | None) -> bool:
+        """Pings and messages with several links are the first to be dropped under load."""
+        return message_group is Messages.UKWIKIBOT or (message_group is Messages.LINK and len(matches or []) > 1)
+
+    async def get_response_stream(self, message: str) -> Tuple[AsyncIterator[Any] | None, MessageTypes | None]:
         response = await self.get_matches(message)
         if not response:
             return None, None
         message_group, matches = response
         message_name, message_type = message_group.value
+        current_intent.set(message_name)
+        if self.low_priority(message_group, matches) and self.wiki_manager.overloaded:
+            raise Overloaded(f"{message_name} is shed while the bot is overloaded")
+        if message_group not in self.NO_WARM_UP:
+            await self.wait_ready()
         func = getattr(self, f"get_{message_name}_message")
+        return func(matches), message_type
+
+    async def get_response(self, message: str) -> Tuple[List[Any] | None, MessageTypes | None]:
+        stream, message_type = await self.get_response_stream(message)
+        if stream is None:
+            return None, None
         responses = []
-        async for match in func(matches):
+        async for match in stream:
             responses.append(match)
 
         return responses, message_type
+
+    def collect_metrics(self) -> None:
+        """Refresh the gauges of the caches and queues behind this parser."""
+        manager = self.wiki_manager
+        caches = [
+            ("entities", manager.entities),
+            ("entity_ids", manager.entity_ids),
+            ("search", manager.search_cache),
+            ("summaries", manager.summaries),
+        ]
+        if manager.api_cache is not None:
+            caches.append(("api_responses", manager.api_cache))
+        for name, cache in caches:
+            stats = cache.stats()
+            CACHE_REQUESTS.set_total(stats.hits, cache=name, result="hit")
+            CACHE_REQUESTS.set_total(stats.misses, cache=name, result="miss")
+            CACHE_SIZE.set(stats.size, cache=name)
+            CACHE_HIT_RATE.set(stats.hit_rate, cache=name)
+        morph = manager.lemmatizer.stats()
+        hits = morph.table_hits + morph.cache_hits
+        CACHE_REQUESTS.set_total(hits, cache="morph", result="hit")
+        CACHE_REQUESTS.set_total(morph.analyzer_calls, cache="morph", result="miss")
+        CACHE_SIZE.set(morph.cache_size, cache="morph")
+        CACHE_HIT_RATE.set(hits / ((hits + morph.analyzer_calls) or 1), cache="morph")
+        if self.file_ids is not None:
+            CACHE_SIZE.set(len(self.file_ids), cache="file_ids")
+        if manager.random_pool is not None:
+            CACHE_SIZE.set(len(manager.random_pool), cache="random_pool")
+        QUEUE_DEPTH.set(self.fan_out.waiting, queue="fan_out")
+        IN_PROGRESS.set(self.fan_out.running, queue="fan_out")
+        QUEUE_DEPTH.set(manager.executor.queued, queue="executor")
+        IN_PROGRESS.set(manager.executor.running, queue="executor")
+        for name, queue in manager.executors.items():
+            QUEUE_DEPTH.set(queue.queued, queue=f"executor_{name}")
+            IN_PROGRESS.set(queue.running, queue=f"executor_{name}")
+            REJECTED.set_total(queue.rejected, queue=f"executor_{name}")
+        flights = manager.single_flight.stats()
+        IN_PROGRESS.set(flights["in_flight"], queue="single_flight")
+        COALESCED.set_total(flights["coalesced"])
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, Tuple
+
+from httpx import AsyncClient, HTTPError, Timeout
+
+from wikibot.config import config
+
+logger = logging.getLogger(__name__)
+
+EDIT_TYPES = ("edit", "new")
+
+
+def parse_change(event: Dict[str, Any], wiki: str) -> Tuple[str, int] | None:
+    """Return (title, new revision) of an article edit on ``wiki``, None for anything else."""
+    if event.get("wiki") != wiki or event.get("namespace") != 0 or event.get("type") not in EDIT_TYPES:
+        return None
+    revid = event.get("revision", {}).get("new")
+    return (event["title"], revid) if event.get("title") and revid else None
+
+
+async def iter_events(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[str | None, Dict[str, Any]]]:
+    """Parse server-sent events into (event id, JSON data) pairs, plain JSON lines are accepted as well."""
+    event_id, data = None, []
+    async for line in lines:
+        line = line.rstrip("\r\n")
+        if line.startswith("{"):
+            yield None, json.loads(line)
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+        elif line.startswith("id:"):
+            event_id = line[3:].strip()
+        elif not line and data:
+            try:
+                yield event_id, json.loads("\n".join(data))
+            except ValueError:
+                logger.warning("Cannot decode recent change")
+            data = []
+
+
+async def read_file(path: str) -> AsyncIterator[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield line
+    yield ""
+
+
+class RecentChangesFeed:
+    """Invalidates cached summaries of articles edited since they were fetched.
+
+    ``source`` is the EventStreams recent-changes URL, or a file of recorded events, one JSON
+    object per line or in the server-sent events format, which is replayed once.
+    """
+
+    def __init__(self, manager, source: str, http_client: AsyncClient | None = None, wiki: str = "ukwiki"):
+        self.manager = manager
+        self.source = source
+        self.http_client = http_client
+        self.wiki = wiki
+        self.last_event_id: str | None = None
+        self.changes = 0
+
+    async def consume(self, lines: AsyncIterator[str]) -> None:
+        async for event_id, event in iter_events(lines):
+            if event_id:
+                self.last_event_id = event_id
+            if isinstance(event, dict) and (change := parse_change(event, self.wiki)):
+                self.manager.note_revision(*change)
+                self.changes += 1
+
+    async def stream_lines(self) -> AsyncIterator[str]:
+        headers = {"Accept": "text/event-stream"}
+        if self.last_event_id:
+            headers["Last-Event-ID"] = self.last_event_id
+        timeout = Timeout(config.http_timeout, read=config.recent_changes_read_timeout)
+        async with self.http_client.stream("GET", self.source, headers=headers, timeout=timeout) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                yield line
+
+    async def run(self) -> None:
+        """Follow the stream until cancelled, reconnecting where it left off after any error."""
+        if not self.source.startswith(("http://", "https://")):
+            await self.consume(read_file(self.source))
+            logger.info(f"Replayed {self.changes} recent changes from {self.source}")
+            return
+        while True:
+            try:
+                await self.consume(self.stream_lines())
+            except (HTTPError, ValueError) as e:
+                logger.warning(f"Recent changes stream failed, reconnecting: {e!r}")
+            except Exception:  # noqa
+                logger.exception("Unexpected recent changes error, reconnecting")
+            await asyncio.sleep(config.recent_changes_reconnect)
+
+
+def log_stopped(task: asyncio.Future) -> None:
+    """Done-callback of the feed task, which only ends by cancellation or after replaying a file."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Recent changes feed stopped, cached summaries are no longer invalidated: {task.exception()!r}")
@@ -0,0 +1,201 @@
+"""Stand-in for the MediaWiki, Wikidata and Commons APIs that replays recorded responses.
+
+Record a cassette by proxying to the live sites once, then replay it offline with injected latency:
+
+    python -m wikibot.replay record cassette.jsonl --port 8090
+    python -m wikibot.replay replay cassette.jsonl --port 8090 --latency 0.05 --jitter 0.02
+
+The server prints the environment that points the async backend at it.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import os
+import random
+from dataclasses import dataclass
+from typing import Dict
+from urllib.parse import parse_qsl, urlencode
+
+from httpx import AsyncClient
+
+from wikibot.api_cache import IGNORED_PARAMS
+from wikibot.server import HttpServer, Request, Response
+
+logger = logging.getLogger(__name__)
+
+UPSTREAMS = {
+    "uk": "https://uk.wikipedia.org",
+    "wikidata": "https://www.wikidata.org",
+    "commons": "https://commons.wikimedia.org",
+    "upload": "https://upload.wikimedia.org",
+}
+
+
+def request_key(target: str) -> str:
+    """Identify a request by its path and sorted query, so parameter order does not matter."""
+    path, _, query = target.partition("?")
+    params = [(name, value) for name, value in parse_qsl(query, keep_blank_values=True) if name not in IGNORED_PARAMS]
+    return f"{path}?{urlencode(sorted(params))}"
+
+
+@dataclass
+class Recording:
+    status: int
+    content_type: str
+    body: bytes = b""
+    location: str | None = None
+
+    def to_json(self, key: str) -> str:
+        data = {"key": key, "status": self.status, "content_type": self.content_type, "location": self.location}
+        if self.content_type.startswith(("application/json", "text/")):
+            data["body"] = self.body.decode()
+        else:
+            data["body_base64"] = base64.b64encode(self.body).decode()
+        return json.dumps(data, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "Recording":
+        body = data["body"].encode() if "body" in data else base64.b64decode(data.get("body_base64", ""))
+        return cls(data["status"], data["content_type"], body, data.get("location"))
+
+
+class Cassette:
+    """Recorded responses kept in a JSON-lines file, new recordings are appended as they arrive."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.recordings: Dict[str, Recording] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        data = json.loads(line)
+                        self.recordings[data["key"]] = Recording.from_json(data)
+
+    def get(self, key: str) -> Recording | None:
+        return self.recordings.get(key)
+
+    def add(self, key: str, recording: Recording) -> None:
+        self.recordings[key] = recording
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(recording.to_json(key) + "\n")
+
+    def __len__(self) -> int:
+        return len(self.recordings)
+
+
+class ReplayServer:
+    """Serves recorded responses under /uk/, /wikidata/, /commons/ and /upload/.
+
+    With an ``upstream`` client, requests missing from the cassette are fetched from the live
+    sites and recorded. Links to the live sites in replayed responses are rewritten to the stand-in.
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        upstream: AsyncClient | None = None,
+    ):
+        self.cassette = cassette
+        self.latency = latency
+        self.jitter = jitter
+        self.upstream = upstream
+        self.hits = 0
+        self.misses = 0
+        self.server = HttpServer(host, port)
+        self.server.route("GET", "*", self.handle)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.server.host}:{self.server.bound_port}"
+
+    def environment(self) -> Dict[str, str]:
+        return {
+            "WIKI_BACKEND": "async",
+            "WIKI_API_URL": f"{self.base_url}/uk/w/api.php",
+            "WIKI_ARTICLE_URL": f"{self.base_url}/uk/wiki/",
+            "WIKIDATA_API_URL": f"{self.base_url}/wikidata/w/api.php",
+            "COMMONS_API_URL": f"{self.base_url}/commons/w/api.php",
+        }
+
+    async def start(self) -> None:
+        await self.server.start()
+
+    async def stop(self) -> None:
+        await self.server.stop()
+
+    async def handle(self, request: Request) -> Response:
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        key = request_key(request.path)
+        recording = self.cassette.get(key)
+        if recording is None and self.upstream is not None:
+            recording = await self.fetch(request.path)
+            self.cassette.add(key, recording)
+        if recording is None:
+            self.misses += 1
+            logger.warning(f"No recording for {key}")
+            return Response(404, b"Not recorded")
+        self.hits += 1
+        body = recording.body
+        if recording.content_type.startswith(("application/json", "text/")):
+            body = self.rewrite(body.decode()).encode()
+        headers = {"Location": self.rewrite(recording.location)} if recording.location else {}
+        return Response(recording.status, body, content_type=recording.content_type, headers=headers)
+
+    def rewrite(self, text: str) -> str:
+        for prefix, upstream in UPSTREAMS.items():
+            text = text.replace(upstream, f"{self.base_url}/{prefix}")
+        return text
+
+    async def fetch(self, target: str) -> Recording:
+        prefix, _, rest = target.lstrip("/").partition("/")
+        if prefix not in UPSTREAMS:
+            return Recording(404, "text/plain")
+        response = await self.upstream.get(f"{UPSTREAMS[prefix]}/{rest}")
+        content_type = response.headers.get("content-type", "application/octet-stream")
+        # Only the status and the final URL of article pages matter to the bot
+        body = b"" if content_type.startswith("text/html") else response.content
+        return Recording(response.status_code, content_type, body, response.headers.get("location"))
+
+
+async def serve(args: argparse.Namespace) -> None:
+    upstream = AsyncClient(headers={"User-Agent": "ukwikibot-replay"}) if args.mode == "record" else None
+    server = ReplayServer(Cassette(args.cassette), args.host, args.port, args.latency, args.jitter, upstream)
+    await server.start()
+    print(f"{args.mode.capitalize()}ing {len(server.cassette)} responses from {args.cassette}, point the bot at it:")
+    for name, value in server.environment().items():
+        print(f"{name}={value}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+        if upstream is not None:
+            await upstream.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record and replay the wiki APIs used by the bot")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("cassette", help="JSON-lines file with recorded responses")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra seconds, up to this value")
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_SIZE = 1024 * 1024
+
+REASONS = {
+    200: "OK",
+    301: "Moved Permanently",
+    302: "Found",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    408: "Request Timeout",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    headers: Dict[str, str]
+    body: bytes = b""
+
+
+@dataclass
+class Response:
+    status: int = 200
+    body: bytes = b""
+    content_type: str = "text/plain; charset=utf-8"
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class HttpServer:
+    """Small asyncio HTTP/1.1 server for the webhook, health and metrics endpoints.
+
+    Every connection serves one request and is closed, which is all Telegram and Prometheus need. The
+    request has to arrive within ``read_timeout`` seconds, and connections beyond ``max_connections`` are
+    answered with 503 right away, so idle or slow clients cannot hold the server.
+    """
+
+    def __init__(self, host: str, port: int, read_timeout: float = 10, max_connections: int = 100):
+        self.host = host
+        self.port = port
+        self.read_timeout = read_timeout
+        self.max_connections = max_connections
+        self.routes: Dict[Tuple[str, str], Handler] = {}
+        self.server: asyncio.Server | None = None
+        self.connections: Set[asyncio.Task] = set()
+
+    def route(self, method: str, path: str, handler: Handler) -> None:
+        """Register a handler for an exact path, or for every other path of the method with "*"."""
+        self.routes[(method, path)] = handler
+
+    @property
+    def bound_port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._serve, self.host, self.port)
+        logger.info(f"Listening on {self.host}:{self.bound_port}")
+
+    async def stop(self, timeout: float = 10) -> None:
+        """Stop accepting connections and wait for the ones in progress to finish."""
+        if self.server is None:
+            return
+        self.server.close()
+        if self.connections:
+            await asyncio.wait(self.connections, timeout=timeout)
+        self.server = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            if len(self.connections) > self.max_connections:
+                response = Response(503, b"Too many connections")
+            else:
+                response = await self._handle(reader)
+            await self._write(writer, response)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+            self.connections.discard(task)
+
+    async def _handle(self, reader: asyncio.StreamReader) -> Response:
+        try:
+            request = await asyncio.wait_for(self._read(reader), self.read_timeout)
+        except asyncio.TimeoutError:
+            return Response(408, b"Request timeout")
+        if isinstance(request, Response):
+            return request
+        handler = self.routes.get((request.method, request.path.split("?", 1)[0])) or self.routes.get(
+            (request.method, "*")
+        )
+        if handler is None:
+            return Response(404, b"Not found")
+        try:
+            return await handler(request)
+        except Exception:  # noqa
+            logger.exception(f"Cannot handle {request.method} {request.path}")
+            return Response(500, b"Internal error")
+
+    @staticmethod
+    async def _read(reader: asyncio.StreamReader) -> Request | Response:
+        """Read the request head and body, or return the error response for a malformed one."""
+        head = await reader.readuntil(b"\r\n\r\n")
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = request_line.split(" ", 2)
+        except ValueError:
+            return Response(400)
+        headers = {}
+        for line in header_lines:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        length = headers.get("content-length") or "0"
+        if not (length.isascii() and length.isdigit()):
+            return Response(400, b"Bad Content-Length")
+        length = int(length)
+        if length > MAX_BODY_SIZE:
+            return Response(413)
+        body = await reader.readexactly(length) if length else b""
+        return Request(method.upper(), target, headers, body)
+
+    @staticmethod
+    async def _write(writer: asyncio.StreamWriter, response: Response) -> None:
+        reason = REASONS.get(response.status, "Internal Server Error")
+        headers = {
+            "Content-Type": response.content_type,
+            "Content-Length": str(len(response.body)),
+            "Connection": "close",
+            **response.headers,
+        }
+        head = f"HTTP/1.1 {response.status} {reason}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+        writer.write(head.encode("latin-1") + b"\r\n" + response.body)
+        await writer.drain()
@@ -0,0 +1,216 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from functools import lru_cache, partial
+from typing import Any, Callable, Hashable, List, Tuple
+
+from wikibot.api import WikiPage
+from wikibot.cache import MISSING, CacheStats, TTLCache
+from wikibot.config import config
+
+logger = logging.getLogger(__name__)
+
+PRUNE_EVERY = 256
+# Writes committed together by the writer thread
+WRITE_BATCH = 128
+
+
+def encode(value: Any) -> str:
+    """JSON for the values the caches hold, TypeError for objects that cannot leave the process."""
+
+    def default(obj: Any) -> Any:
+        if isinstance(obj, WikiPage):
+            return {"__page__": [obj.title(), obj.pageid, obj.qid, obj.lastrevid, obj.extract]}
+        raise TypeError(f"{type(obj).__name__} is not shared")
+
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=default)
+
+
+def decode(data: str) -> Any:
+    return json.loads(data, object_hook=lambda obj: WikiPage(*obj["__page__"]) if "__page__" in obj else obj)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=5)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class SharedStore:
+    """Cache entries in one SQLite file in WAL mode, shared by every worker process on the host.
+
+    Every namespace holds at most ``maxsize`` entries, the oldest ones are pruned every few writes.
+    Writes are queued to a writer thread that commits them in batches on a connection of its own, so
+    the event loop never waits for the write lock another worker holds. Reads use a separate connection
+    and, in WAL mode, do not wait for writers.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._pending: queue.SimpleQueue = queue.SimpleQueue()
+        self.writer = connect(path)
+        self.writer.execute(
+            "CREATE TABLE IF NOT EXISTS entries (namespace TEXT, key TEXT, value TEXT NOT NULL, "
+            "created REAL NOT NULL, expires REAL, PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+        )
+        self.writer.execute("CREATE INDEX IF NOT EXISTS entries_created ON entries (namespace, created)")
+        self.connection = connect(path)
+        self._thread = threading.Thread(target=self._write_loop, name="shared-cache-writer", daemon=True)
+        self._thread.start()
+
+    def get(self, namespace: str, key: str) -> Tuple[str, float | None] | None:
+        """Return the value and the seconds it has left to live, None for no expiry."""
+        now = time.time()
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT value, expires FROM entries "
+                "WHERE namespace = ? AND key = ? AND (expires IS NULL OR expires > ?)",
+                (namespace, key, now),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1] - now if row[1] is not None else None
+
+    def set(self, namespace: str, key: str, value: str, ttl: float | None, maxsize: int) -> None:
+        """Queue a write, other processes see it once the writer thread commits its batch."""
+        self._pending.put(partial(self._set, namespace, key, value, time.time(), ttl, maxsize))
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._pending.put(partial(self._delete, namespace, key))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until the writes queued so far are committed."""
+        done = threading.Event()
+        self._pending.put(done)
+        return done.wait(timeout)
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._pending.get()]
+            while len(batch) < WRITE_BATCH and not self._pending.empty():
+                batch.append(self._pending.get())
+            # Besides the writes, a batch can hold the events of flush() and None from close()
+            self._commit([write for write in batch if callable(write)])
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if None in batch:
+                return
+
+    def _commit(self, writes: List[Callable[[], None]]) -> None:
+        if not writes:
+            return
+        try:
+            self.writer.execute("BEGIN IMMEDIATE")
+            for write in writes:
+                write()
+            self.writer.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.warning(f"Cannot write {len(writes)} shared cache entries: {e!r}")
+            if self.writer.in_transaction:
+                self.writer.execute("ROLLBACK")
+
+    def _set(self, namespace: str, key: str, value: str, now: float, ttl: float | None, maxsize: int) -> None:
+        self.writer.execute(
+            "INSERT OR REPLACE INTO entries (namespace, key, value, created, expires) VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, value, now, now + ttl if ttl is not None else None),
+        )
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self._prune(namespace, maxsize, now)
+
+    def _prune(self, namespace: str, maxsize: int, now: float) -> None:
+        self.writer.execute("DELETE FROM entries WHERE namespace = ? AND expires <= ?", (namespace, now))
+        self.writer.execute(
+            "DELETE FROM entries WHERE namespace = ? AND key IN (SELECT key FROM entries WHERE namespace = ? "
+            "ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (namespace, namespace, maxsize),
+        )
+
+    def _delete(self, namespace: str, key: str) -> None:
+        self.writer.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def close(self) -> None:
+        """Commit the queued writes and stop the writer thread."""
+        self._pending.put(None)
+        self._thread.join()
+        self.writer.close()
+        self.connection.close()
+
+
+@lru_cache(maxsize=None)
+def shared_store(path: str) -> SharedStore:
+    return SharedStore(path)
+
+
+class TieredCache:
+    """A TTLCache in front of the shared store, with the same interface.
+
+    Misses in the process are looked up in the store, so an entry fetched by one worker is a hit
+    for all of them. Values that cannot be encoded, such as pywikibot objects, stay in the process.
+    """
+
+    def __init__(self, local: TTLCache, store: SharedStore, namespace: str):
+        self.local = local
+        self.store = store
+        self.namespace = namespace
+        self.shared_hits = 0
+
+    @staticmethod
+    def key(key: Hashable) -> str:
+        return json.dumps(key, ensure_ascii=False)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        value = self.local.get(key)
+        if value is not MISSING:
+            return value
+        entry = self.store.get(self.namespace, self.key(key))
+        if entry is None:
+            return default
+        data, ttl = entry
+        value = decode(data)
+        self.shared_hits += 1
+        self.local.set(key, value, ttl=ttl)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = MISSING) -> None:
+        ttl = self.local.ttl if ttl is MISSING else ttl
+        self.local.set(key, value, ttl=ttl)
+        try:
+            data = encode(value)
+        except TypeError:
+            return
+        self.store.set(self.namespace, self.key(key), data, ttl, self.local.maxsize)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        self.store.delete(self.namespace, self.key(key))
+        return self.local.pop(key, default)
+
+    def clear(self) -> None:
+        self.local.clear()
+
+    def stats(self) -> CacheStats:
+        """Shared hits count as hits, they were misses of the local tier."""
+        stats = self.local.stats()
+        stats.hits += self.shared_hits
+        stats.misses -= self.shared_hits
+        return stats
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.local or self.store.get(self.namespace, self.key(key)) is not None
+
+    def __len__(self) -> int:
+        return len(self.local)
+
+
+def make_cache(namespace: str, maxsize: int, ttl: float | None) -> TTLCache | TieredCache:
+    """A process-local cache, backed by the shared store when SHARED_CACHE_PATH is set."""
+    local = TTLCache(maxsize=maxsize, ttl=ttl)
+    if not config.shared_cache_path:
+        return local
+    return TieredCache(local, shared_store(config.shared_cache_path), namespace)
@@ -0,0 +1,61 @@
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class FileIdCache:
+    """Persistent mapping of image URL to the Telegram file_id of its first upload.
+
+    Entries live for ``ttl`` seconds and the least recently used ones are evicted above ``maxsize``.
+    """
+
+    def __init__(self, path: str, maxsize: int = 10_000, ttl: float = 30 * 24 * 60 * 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS file_ids "
+            "(url TEXT PRIMARY KEY, file_id TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS file_ids_last_used ON file_ids (last_used)")
+
+    def get(self, url: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT file_id FROM file_ids WHERE url = ? AND created > ?", (url, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE file_ids SET last_used = ? WHERE url = ?", (now, url))
+            return row[0]
+
+    def set(self, url: str, file_id: str) -> None:
+        now = time.time()
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO file_ids (url, file_id, created, last_used) VALUES (?, ?, ?, ?)",
+                (url, file_id, now, now),
+            )
+            self.connection.execute("DELETE FROM file_ids WHERE created <= ?", (now - self.ttl,))
+            self.connection.execute(
+                "DELETE FROM file_ids WHERE url IN "
+                "(SELECT url FROM file_ids ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+    def discard(self, url: str) -> None:
+        with self._lock:
+            self.connection.execute("DELETE FROM file_ids WHERE url = ?", (url,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM file_ids").fetchone()[0]
+
+    def close(self) -> None:
+        self.connection.close()
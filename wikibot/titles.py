@@ -0,0 +1,60 @@
+import hashlib
+from array import array
+from bisect import bisect_left
+from typing import Iterable, List
+
+from wikibot.local_index import open_dump, title_key
+
+
+def title_id(title: str) -> str:
+    """Short id of a title for inline results, the same in every worker and after a restart or reload."""
+    return hashlib.blake2b(title.encode(), digest_size=8).hexdigest()
+
+
+class TitleIndex:
+    """In-memory prefix index over article titles for inline suggestions.
+
+    Titles are kept in one list sorted by their normalised key, a prefix lookup is a binary search
+    followed by a slice, so answering a keystroke never touches the network. The ids of the titles are kept
+    sorted in a compact array next to their positions, so the title of a chosen result is found by its id.
+    """
+
+    def __init__(self, titles: Iterable[str]):
+        self.titles: List[str] = sorted({title.replace("_", " ") for title in titles}, key=title_key)
+        hashes = array("Q", (int(title_id(title), 16) for title in self.titles))
+        order = sorted(range(len(hashes)), key=hashes.__getitem__)
+        self.ids = array("Q", (hashes[position] for position in order))
+        self.positions = array("L", order)
+
+    @classmethod
+    def from_file(cls, path: str) -> "TitleIndex":
+        """Load a titles dump such as ukwiki-latest-all-titles-in-ns0.gz, one title per line."""
+        with open_dump(path) as f:
+            return cls(title for line in f if (title := line.rstrip("\n")) and title != "page_title")
+
+    def complete(self, prefix: str, limit: int, offset: int = 0) -> List[str]:
+        """Return up to ``limit`` titles starting with ``prefix``, skipping ``offset`` matches."""
+        key = title_key(prefix)
+        if not key:
+            return []
+        start = bisect_left(self.titles, key, key=title_key) + offset
+        matches = []
+        for position in range(start, min(start + limit, len(self.titles))):
+            if not title_key(self.titles[position]).startswith(key):
+                break
+            matches.append(self.titles[position])
+        return matches
+
+    def title(self, result_id: str) -> str | None:
+        """The title whose ``title_id`` is ``result_id``."""
+        try:
+            value = int(result_id, 16)
+        except ValueError:
+            return None
+        index = bisect_left(self.ids, value)
+        if index == len(self.ids) or self.ids[index] != value:
+            return None
+        return self.titles[self.positions[index]]
+
+    def __len__(self) -> int:
+        return len(self.titles)
@@ -0,0 +1,59 @@
+import hmac
+import json
+import logging
+
+from telegram import Update
+from telegram.ext import Application
+
+from wikibot.config import config
+from wikibot.server import HttpServer, Request, Response
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+
+class WebhookServer:
+    """Receives updates pushed by Telegram and feeds them to the application's update queue."""
+
+    def __init__(self, application: Application, host: str, port: int, path: str, secret_token: str | None = None):
+        self.application = application
+        self.secret_token = secret_token
+        self.server = HttpServer(
+            host, port, read_timeout=config.webhook_read_timeout, max_connections=config.webhook_max_connections
+        )
+        self.server.route("POST", path, self.handle_update)
+        self.server.route("GET", "/healthz", self.health)
+
+    async def handle_update(self, request: Request) -> Response:
+        if self.secret_token and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), self.secret_token):
+            return Response(403, b"Forbidden")
+        try:
+            data = json.loads(request.body)
+            if not isinstance(data, dict):
+                raise TypeError(f"update is {type(data).__name__}, not an object")
+            update = Update.de_json(data, self.application.bot)
+        except (ValueError, TypeError, KeyError):
+            logger.warning("Cannot decode webhook update")
+            return Response(400, b"Bad update")
+        await self.application.update_queue.put(update)
+        return Response(200, b"ok")
+
+    async def health(self, _: Request) -> Response:
+        if not self.application.running:
+            return Response(503, b"not running")
+        parser = self.application.bot_data.get("message_parser")
+        if parser is not None and not parser.ready:
+            return Response(503, b"starting")
+        return Response(200, b"ok")
+
+    async def start(self) -> None:
+        await self.server.start()
+        if config.webhook_url:
+            await self.application.bot.set_webhook(
+                config.webhook_url, secret_token=self.secret_token, allowed_updates=Update.ALL_TYPES
+            )
+
+    async def stop(self) -> None:
+        """Stop taking updates, requests in progress finish and Application.stop drains the queue."""
+        await self.server.stop(timeout=config.webhook_drain_timeout)
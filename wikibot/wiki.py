@@ -1,13 +1,27 @@
 import asyncio
+import datetime
 import logging
 import re
-from typing import List, Tuple
+from abc import ABC, abstractmethod
+from functools import lru_cache, partial
+from typing import Any, Dict, List, Tuple
 from urllib.parse import unquote
 
-import pymorphy3
 import pywikibot.config
-
+import pywikibot.data.api
+from httpx import AsyncClient
+from pywikibot.login import LoginStatus
+
+from wikibot.api import WikiApiClient, WikiPage
+from wikibot.api_cache import ResponseCache, api_modules, parse_ttls, request_key
+from wikibot.cache import MISSING, TTLCache
+from wikibot.concurrency import ExecutorQueue, FanOut, RefillPool, SingleFlight
 from wikibot.config import config
+from wikibot.local_index import LocalIndex
+from wikibot.metrics import timed
+from wikibot.morph import GenitiveLemmatizer, GenitiveTable
+from wikibot.shared_cache import make_cache
+from wikibot.titles import TitleIndex
 
 MONTH_MAP = [
     "січня",
@@ -24,14 +38,451 @@ MONTH_MAP = [
     "грудня",
 ]
 
+GREGORIAN_CALENDAR = "Q1985727"
+MALE = "Q6581097"
+FEMALE = "Q6581072"
+
+PAGE_PROPS = {
+    "prop": "pageprops|extracts|info",
+    "ppprop": "wikibase_item",
+    "exsentences": 7,
+    "explaintext": 1,
+}
+# Several extracts per request are only returned for the intro section, at most 20 of them
+RANDOM_PROPS = {
+    "prop": "pageprops|extracts|info",
+    "ppprop": "wikibase_item",
+    "exintro": 1,
+    "exsentences": 7,
+    "explaintext": 1,
+    "exlimit": "max",
+}
+
 logger = logging.getLogger(__name__)
 
 
-class WikiManager:
+def make_page(result: Dict[str, Any] | None) -> WikiPage | None:
+    if result is None or "missing" in result:
+        return None
+    return WikiPage(
+        result["title"],
+        pageid=result.get("pageid"),
+        qid=result.get("pageprops", {}).get("wikibase_item"),
+        lastrevid=result.get("lastrevid"),
+        extract=result.get("extract"),
+    )
+
+
+def item_ids(values: List[Any]) -> List[str]:
+    return [value["id"] for value in values if isinstance(value, dict) and "id" in value]
+
+
+def gender_from_values(values: List[Any]) -> str:
+    target = values[0].get("id") if values else None
+    if target == MALE:
+        return "male"
+    elif target == FEMALE:
+        return "female"
+    return "unknown"
+
+
+def coords_from_values(values: List[Any]) -> Tuple[float, float] | None:
+    for value in values:
+        return value["latitude"], value["longitude"]
+
+
+def date_from_values(values: List[Any]) -> str | None:
+    for value in values:
+        if GREGORIAN_CALENDAR in value.get("calendarmodel", ""):
+            year, month, day = re.match(r"([+-]\d+)-(\d+)-(\d+)", value["time"]).groups()
+            return f"{int(day)} {MONTH_MAP[int(month) - 1]} {int(year)}"
+
+
+def texts_from_values(values: List[Any], labels: Dict[str, str]) -> List[str]:
+    items = []
+    for value in values:
+        if isinstance(value, str):
+            items.append(value)
+        elif isinstance(value, dict) and value.get("id") in labels:
+            items.append(labels[value["id"]])
+    return items
+
+
+@lru_cache(maxsize=None)
+def shared_site() -> pywikibot.site.BaseSite:
+    """One pywikibot site per process, creating it already makes a request to the wiki."""
+    return pywikibot.Site(code="uk", fam="wikipedia")
+
+
+class PersistentRequestMixin:
+    """Shared by the request classes that keep their responses in the ResponseCache."""
+
+    cache: ResponseCache | None = None
+    # Set on a request that must reach the wiki, its response replaces the cached one
+    refresh = False
+
+    def cache_entry(self, default: float = 0) -> Tuple[str, str, float]:
+        """Return the key, endpoint and TTL of this request's response, a TTL of 0 means it is not cached.
+
+        pywikibot adds meta=userinfo to every query, so the modules are taken from the parameters as they
+        were before its defaults. A query that asks for userinfo itself is only cached if that has a TTL.
+        """
+        if not hasattr(self, "requested_modules"):
+            self.requested_modules = api_modules(
+                {name: "|".join(map(str, values)) for name, values in self._params.items()}
+            )
+        self._add_defaults()
+        params = {name: str(value) for name, value in self._encoded_items().items()}
+        user = self.site.username() if self.site._loginstatus >= LoginStatus.AS_USER else None
+        ttl = 0 if self.write or self.cache is None else self.cache.ttl(self.requested_modules, default)
+        return request_key(f"{self.site!r}:{user}", params), "|".join(self.requested_modules), ttl
+
+
+class PersistentRequest(PersistentRequestMixin, pywikibot.data.api.Request):
+    def submit(self) -> dict:
+        key, endpoint, ttl = self.cache_entry()
+        if ttl <= 0:
+            return super().submit()
+        if not self.refresh and (entry := self.cache.get(key)) is not None:
+            return entry[0]
+        response = super().submit()
+        self.cache.set(key, endpoint, response, ttl)
+        return response
+
+
+class PersistentCachedRequest(PersistentRequestMixin, pywikibot.data.api.CachedRequest):
+    """pywikibot's own cached requests, such as site and parameter info, stored in the cache instead of apicache."""
+
+    def _load_cache(self) -> bool:
+        if self.cache is None:
+            return super()._load_cache()
+        key, _, _ = self.cache_entry()
+        if (entry := self.cache.get(key)) is None:
+            return False
+        self._data, created = entry
+        self._cachetime = pywikibot.Timestamp.fromtimestamp(created, tz=datetime.timezone.utc)
+        return True
+
+    def _write_cache(self, data) -> None:
+        if self.cache is None:
+            return super()._write_cache(data)
+        key, endpoint, ttl = self.cache_entry(default=self.expiry.total_seconds())
+        if ttl > 0:
+            self.cache.set(key, endpoint, data, ttl)
+
+
+def persistent_request_class(kwargs: Dict[str, Any]) -> type:
+    return PersistentCachedRequest if kwargs.get("expiry") is not None else PersistentRequest
+
+
+def install_response_cache(cache: ResponseCache) -> None:
+    """Send the API requests of every pywikibot site through ``cache``."""
+    PersistentRequestMixin.cache = cache
+    pywikibot.site.APISite._request_class = staticmethod(persistent_request_class)
+
+
+class BaseWikiManager(ABC):
+    """Backend independent part of the manager: morphology, formatting and composed lookups."""
+
     def __init__(self):
         self.loop = asyncio.get_running_loop()
-        self.site = pywikibot.Site(code="uk", fam="wikipedia")
-        self.morph = pymorphy3.MorphAnalyzer(lang="uk")
+        table = GenitiveTable(config.genitive_table_path) if config.genitive_table_path else None
+        self.lemmatizer = GenitiveLemmatizer(table=table, maxsize=config.morph_cache_size)
+        self.entities = make_cache("entities", config.entity_cache_size, config.entity_cache_ttl)
+        self.entity_ids = make_cache("entity_ids", config.entity_cache_size, config.entity_cache_ttl)
+        self.search_cache = make_cache("search", config.search_cache_size, config.search_cache_ttl)
+        # Rendered summaries keyed by page id, each stored with the revision it was rendered from
+        self.summaries = make_cache("summaries", config.summary_cache_size, config.summary_cache_ttl)
+        # Latest revisions seen on the recent-changes feed, pages in the search cache older than these are stale
+        self.revisions = TTLCache(maxsize=config.summary_cache_size, ttl=config.search_cache_ttl)
+        self.fan_out = FanOut(
+            per_call=config.fan_out_per_message, total=config.fan_out_total, timeout=config.item_timeout
+        )
+        self.single_flight = SingleFlight()
+        # Startup work, the wiki calls of the pywikibot backend get pools of their own
+        self.executor = ExecutorQueue()
+        self.executors: Dict[str, ExecutorQueue] = {}
+        self.local_index = (
+            LocalIndex(config.local_index_path, max_age=config.local_index_max_age) if config.local_index_path else None
+        )
+        self.titles: TitleIndex | None = None
+        self.api_cache: ResponseCache | None = None
+        self.random_pool = (
+            RefillPool(self.random_summaries, low=config.random_pool_low, high=config.random_pool_high)
+            if config.random_pool_high
+            else None
+        )
+
+    def login(self):
+        pass
+
+    @property
+    def overloaded(self) -> bool:
+        """True while a worker queue or the fan-out backlog is busy enough to shed low-priority messages."""
+        pressures = [0.0] + [queue.pressure for queue in self.executors.values()]
+        if config.fan_out_backlog:
+            pressures.append(self.fan_out.waiting / config.fan_out_backlog)
+        return max(pressures) >= config.shed_threshold
+
+    async def warm_up(self) -> None:
+        """Do the slow part of startup off the event loop, the morphology dictionaries and titles are loaded here."""
+        await self.executor.run(lambda: self.lemmatizer.morph)
+        if config.titles_path and self.titles is None:
+            self.titles = await self.executor.run(TitleIndex.from_file, config.titles_path)
+            logger.info(f"Loaded {len(self.titles)} titles for inline suggestions")
+
+    @abstractmethod
+    async def fetch_search_page(self, query: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def make_indexed_page(self, title: str, qid: str | None, extract: str | None):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def fetch_plain_text(self, page, fresh: bool = False) -> str | None:
+        """The intro of the page, ``fresh`` skips any cached response because the page was edited since."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_random_page(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def fetch_random_pages(self, count: int) -> List[Any]:
+        """Random articles with their extracts, fetched in one request."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def fetch_gender(self, page) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def fetch_coords(self, page) -> Tuple[float, float] | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def fetch_wikidata_date(self, page, prop) -> str | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def fetch_wikidata_text(self, page, prop) -> List[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_page_image_info(self, page) -> Tuple[str | None, str | None, str | None]:
+        raise NotImplementedError
+
+    def indexed_claims(self, page) -> Dict[str, List[Any]] | None:
+        """Return the claims of the page from the local index, None if it is not indexed."""
+        if self.local_index is None or page is None:
+            return None
+        qid = getattr(page, "qid", None)
+        if qid is None and (row := self.local_index.page(page.title())):
+            qid = row[1]
+        return self.local_index.claims(qid) if qid else None
+
+    async def get_plain_text(self, page) -> str | None:
+        extract = getattr(page, "extract", None)
+        if extract is None and self.local_index is not None and (row := self.local_index.page(page.title())):
+            extract = row[2]
+        if extract is not None:
+            return self.parse_text(extract)
+        return await self.fetch_plain_text(page)
+
+    async def get_gender(self, page) -> str:
+        if (claims := self.indexed_claims(page)) is not None:
+            return gender_from_values(claims.get("P21", []))
+        return await self.fetch_gender(page)
+
+    async def get_coords(self, page) -> Tuple[float, float] | None:
+        if (claims := self.indexed_claims(page)) is not None:
+            return coords_from_values(claims.get("P625", []))
+        return await self.fetch_coords(page)
+
+    async def get_wikidata_date(self, page, prop) -> str | None:
+        if (claims := self.indexed_claims(page)) is not None:
+            return date_from_values(claims.get(prop, []))
+        return await self.fetch_wikidata_date(page, prop)
+
+    async def get_wikidata_text(self, page, prop) -> List[str]:
+        if (claims := self.indexed_claims(page)) is not None:
+            values = claims.get(prop, [])
+            return texts_from_values(values, self.local_index.labels(item_ids(values)))
+        return await self.fetch_wikidata_text(page, prop)
+
+    @staticmethod
+    def parse_text(text: str) -> str:
+        return re.sub("={2,} ?(.+?)={2,}", r"<b>\1</b>", text)
+
+    def page_revision(self, page) -> Tuple[int, int] | None:
+        """Page id and revision the page was fetched at, known without another request."""
+        pageid, revid = getattr(page, "pageid", None), getattr(page, "lastrevid", None)
+        return (pageid, revid) if pageid and revid else None
+
+    def note_revision(self, title: str, revid: int) -> None:
+        """Record an edit seen on the recent-changes feed."""
+        if revid > self.revisions.get(title, 0):
+            self.revisions.set(title, revid)
+
+    async def get_page_summary(self, page) -> str | None:
+        if page is None:
+            return None
+        revision = self.page_revision(page)
+        if revision is None:
+            return await self.render_summary(page)
+        pageid, revid = revision
+        wanted = max(revid, self.revisions.get(page.title(), 0))
+        cached = self.summaries.get(pageid)
+        if cached is not MISSING and cached[0] >= wanted:
+            return cached[1]
+        # The page object came from the search cache before the edit, so its extract cannot be used
+        summary = await self.render_summary(page, fresh=wanted > revid)
+        if summary is not None:
+            self.summaries.set(pageid, (wanted, summary))
+        return summary
+
+    async def render_summary(self, page, fresh: bool = False) -> str | None:
+        html = await (self.fetch_plain_text(page, fresh=True) if fresh else self.get_plain_text(page))
+        if html is None:
+            return None
+        link = f'<a href="{unquote(page.full_url())}">Читати у Вікіпедії</a>'
+
+        return f"{html}\n\n{link}"
+
+    async def random(self) -> str | None:
+        if self.random_pool is not None:
+            return await self.random_pool.get()
+        page = await self.get_random_page()
+
+        return await self.get_page_summary(page)
+
+    async def random_summaries(self) -> List[str]:
+        """A batch for the random pool, the pages carry their extracts so rendering needs no more requests.
+
+        The summaries stay in the pool only, a refill must not push the articles people asked for out of
+        the summary cache.
+        """
+        with timed("random_batch"):
+            pages = await self.fetch_random_pages(config.random_batch_size)
+        return [summary for page in pages if (summary := await self.render_summary(page))]
+
+    async def get_birthday(self, page):
+        return await self.get_wikidata_date(page, "P569")
+
+    async def get_deathday(self, page):
+        return await self.get_wikidata_date(page, "P570")
+
+    async def get_wikidata_text_list(self, query: str, prop: str) -> str | None:
+        page = await self.genitive_search(query)
+        if not page:
+            return None
+        value = ", ".join(await self.get_wikidata_text(page, prop))
+        return value or None
+
+    async def get_field_of_work(self, page) -> str | None:
+        return await self.get_wikidata_text_list(page, "P101")
+
+    async def get_images_genitive(self, text: str) -> Tuple[str | None, str | None, str | None]:
+        page = await self.genitive_search(text)
+        if page is None:
+            return None, None, None
+        return await self.get_page_image_info(page)
+
+    async def genitive_transform(self, text: str) -> str:
+        word_list = text.split()
+        transformed_word_list = []
+        with timed("morph"):
+            for word in word_list:
+                transformed_word = self.lemmatizer.nominative(word) or word
+                transformed_word_list.append(transformed_word.capitalize() if word.istitle() else transformed_word)
+        transformed_text = " ".join(transformed_word_list)
+        logger.debug(f"Transforming {text} to {transformed_text}")
+        return transformed_text
+
+    @staticmethod
+    def normalise_query(query: str) -> str:
+        query = re.sub(r"[ʼ’`]", "'", query.casefold())
+        return " ".join(re.sub(r"[^\w\s'-]", " ", query).split())
+
+    async def search_page(self, query: str):
+        key = self.normalise_query(query)
+        page = self.search_cache.get(key)
+        if page is not MISSING:
+            return page
+        return await self.single_flight.do(("search", key), partial(self._search_and_cache, query, key))
+
+    async def _search_and_cache(self, query: str, key: str):
+        with timed("search") as timer:
+            if self.local_index is not None and (row := self.local_index.page(key)):
+                page = self.make_indexed_page(*row)
+                timer.outcome = "index"
+            else:
+                page = await self.fetch_search_page(query)
+                timer.outcome = "ok" if page is not None else "not_found"
+        self.search_cache.set(key, page, ttl=config.search_negative_ttl if page is None else config.search_cache_ttl)
+        return page
+
+    async def genitive_search(self, text: str):
+        text = await self.genitive_transform(text)
+        page = await self.search_page(text)
+        if page:
+            return page
+        logger.info("Page not found on Wikipedia")
+
+    async def search(self, text: str) -> str | None:
+        page = await self.search_page(text)
+        return await self.get_page_summary(page)
+
+    async def prefetch_entities(self, pages: List[Any]) -> None:
+        pass
+
+    async def lookup(self, queries: List[str], genitive: bool = False, entities: bool = True) -> List[Any]:
+        """Search pages for all queries and load their Wikidata items in as few requests as the backend allows."""
+        search = self.genitive_search if genitive else self.search_page
+        pages = await self.fan_out.gather(search, queries)
+        if entities:
+            await self.prefetch_entities(
+                [page for page in pages if page is not None and self.indexed_claims(page) is None]
+            )
+        return pages
+
+
+class WikiManager(BaseWikiManager):
+    def __init__(self):
+        super().__init__()
+        self.executors = {
+            name: ExecutorQueue.bounded(name, workers, config.executor_queue_size)
+            for name, workers in (
+                ("search", config.search_workers),
+                ("entity", config.entity_workers),
+                ("extract", config.extract_workers),
+                ("commons", config.commons_workers),
+            )
+        }
+        if config.api_cache_path:
+            self.api_cache = ResponseCache(
+                config.api_cache_path, max_bytes=config.api_cache_max_bytes, ttls=parse_ttls(config.api_cache_ttls)
+            )
+
+    @property
+    def site(self) -> pywikibot.site.BaseSite:
+        return shared_site()
+
+    async def warm_up(self) -> None:
+        await super().warm_up()
+        await self.executor.run(self.connect)
+
+    def connect(self) -> None:
+        """Log in and create the shared site, both talk to the wiki so this runs in the executor."""
+        # pywikibot sleeps in the executor thread between retries, keep that as short as the async backend's
+        pywikibot.config.maxlag = config.wiki_maxlag
+        pywikibot.config.max_retries = config.http_retries
+        pywikibot.config.retry_max = int(config.http_retry_after_max)
+        if self.api_cache is not None:
+            install_response_cache(self.api_cache)
+        self.login()
+        shared_site()
 
     def login(self):
         if not config.wiki_disable_auth:
@@ -44,20 +495,40 @@ class WikiManager:
             )
             pywikibot.config.authenticate["*"] = authenticate
             pywikibot.config.put_throttle = 0
-            self.site = pywikibot.Site(code="uk", fam="wikipedia")
+            shared_site.cache_clear()
             self.site.login()
 
     def _search_page(self, query: str) -> pywikibot.Page | None:
-        page = next(
-            iter(self.site.search(query, total=1, content=True, namespaces=[0])),
-            None,
+        """Search with the page props, so the QID, extract and revision come with the result."""
+        request = self.site.simple_request(
+            action="query",
+            generator="search",
+            gsrsearch=query,
+            gsrlimit=1,
+            gsrnamespace=0,
+            **PAGE_PROPS,
         )
+        found = make_page(next(iter(request.submit().get("query", {}).get("pages", {}).values()), None))
+        if found is None:
+            return None
+        page = self.make_indexed_page(found.title(), found.qid, found.extract)
+        page._pageid, page._revid = found.pageid, found.lastrevid
+        return page
+
+    def make_indexed_page(self, title: str, qid: str | None, extract: str | None) -> pywikibot.Page:
+        page = pywikibot.Page(self.site, title)
+        page.qid, page.extract = qid, extract
         return page
 
-    async def search_page(self, query: str) -> pywikibot.Page | None:
-        return await self.loop.run_in_executor(None, self._search_page, query)
+    def page_revision(self, page: pywikibot.Page) -> Tuple[int, int] | None:
+        # The public properties would load the page info, search results already carry both
+        pageid, revid = getattr(page, "_pageid", None), getattr(page, "_revid", None)
+        return (pageid, revid) if pageid and revid else None
 
-    def _get_plain_text(self, page: pywikibot.Page) -> str | None:
+    async def fetch_search_page(self, query: str) -> pywikibot.Page | None:
+        return await self.executors["search"].run(self._search_page, query)
+
+    def _get_plain_text(self, page: pywikibot.Page, fresh: bool = False) -> str | None:
         params = {
             "action": "query",
             "prop": "extracts",
@@ -67,26 +538,15 @@ class WikiManager:
             "titles": page.title(),
         }
         request = self.site.simple_request(**params)
+        request.refresh = fresh
         response = request.submit()
         try:
             return self.parse_text(next(iter(response["query"]["pages"].values()), None)["extract"])
         except (KeyError, TypeError):
             return None
 
-    async def get_plain_text(self, page: pywikibot.Page):
-        return await self.loop.run_in_executor(None, self._get_plain_text, page)
-
-    @staticmethod
-    def parse_text(text: str) -> str:
-        return re.sub("={2,} ?(.+?)={2,}", r"<b>\1</b>", text)
-
-    async def get_page_summary(self, page: pywikibot.Page | None) -> str | None:
-        if page is None:
-            return None
-        html = await self.get_plain_text(page)
-        link = f'<a href="{unquote(page.full_url())}">Читати у Вікіпедії</a>'
-
-        return f"{html}\n\n{link}"
+    async def fetch_plain_text(self, page: pywikibot.Page, fresh: bool = False):
+        return await self.executors["extract"].run(self._get_plain_text, page, fresh)
 
     def _get_random_page(self) -> pywikibot.Page | None:
         generator = self.site.randompages(total=1, redirects=False, namespaces=[0])
@@ -94,64 +554,113 @@ class WikiManager:
         return next(iter(generator), None)
 
     async def get_random_page(self) -> pywikibot.Page | None:
-        return await self.loop.run_in_executor(None, self._get_random_page)
+        return await self.executors["extract"].run(self._get_random_page)
+
+    def _get_random_pages(self, count: int) -> List[WikiPage]:
+        request = self.site.simple_request(
+            action="query",
+            generator="random",
+            grnlimit=count,
+            grnnamespace=0,
+            grnfilterredir="nonredirects",
+            **RANDOM_PROPS,
+        )
+        pages = request.submit().get("query", {}).get("pages", {}).values()
+        return [page for result in pages if (page := make_page(result)) is not None]
+
+    async def fetch_random_pages(self, count: int) -> List[WikiPage]:
+        return await self.executors["extract"].run(self._get_random_pages, count)
+
+    def cached_item(self, page: pywikibot.Page) -> pywikibot.ItemPage | None:
+        """The ItemPage held by this process, an id shared by another worker still leaves it to be fetched here."""
+        qid = self.entity_ids.get(page.title())
+        item = self.entities.get(qid) if qid is not MISSING else MISSING
+        return item if item is not MISSING else None
+
+    def _get_item(self, page: pywikibot.Page) -> pywikibot.ItemPage:
+        if (item := self.cached_item(page)) is not None:
+            return item
+        title = page.title()
+        qid = self.entity_ids.get(title)
+        if qid is not MISSING:
+            # Another worker already resolved the id, only the item itself is fetched
+            item = pywikibot.ItemPage(self.site.data_repository(), qid)
+        else:
+            item = pywikibot.ItemPage.fromPage(page)
+        item.get()
+        self.entity_ids.set(title, item.getID())
+        self.entities.set(item.getID(), item)
+        return item
 
-    async def random(self) -> str:
-        page = await self.get_random_page()
+    def _load_item(self, page: pywikibot.Page) -> None:
+        try:
+            self._get_item(page)
+        except pywikibot.exceptions.Error:
+            logger.info(f"Cannot load Wikidata item for {page}")
+
+    async def load_item(self, page: pywikibot.Page | None) -> None:
+        """Warm the entity cache, concurrent loads of the same page share one fetch."""
+        if page is None or self.cached_item(page) is not None:
+            return
+        with timed("wikidata"):
+            await self.single_flight.do(
+                ("item", page.title()), partial(self.executors["entity"].run, self._load_item, page)
+            )
 
-        return await self.get_page_summary(page)
+    def _load_items(self, pages: List[pywikibot.Page]) -> None:
+        """Load the items of all pages with one wbgetentities request per 50 of them."""
+        try:
+            for item in self.site.data_repository().preload_entities(pages):
+                self.entity_ids.set(item.getSitelink(self.site), item.getID())
+                self.entities.set(item.getID(), item)
+        except pywikibot.exceptions.Error:
+            logger.info(f"Cannot load Wikidata items for {len(pages)} pages")
+
+    async def prefetch_entities(self, pages: List[pywikibot.Page]) -> None:
+        pages = [page for page in pages if self.cached_item(page) is None]
+        if len(pages) <= 1:
+            await asyncio.gather(*(self.load_item(page) for page in pages))
+            return
+        with timed("wikidata"):
+            await self.executors["entity"].run(self._load_items, pages)
 
     def _get_gender(self, page) -> str:
-        item = pywikibot.ItemPage.fromPage(page)
+        item = self._get_item(page)
         wb_item = next(iter(item.claims["P21"]), None)
-        if wb_item.target.title() == "Q6581097":
+        if wb_item.target.title() == MALE:
             return "male"
-        elif wb_item.target.title() == "Q6581072":
+        elif wb_item.target.title() == FEMALE:
             return "female"
         return "unknown"
 
-    async def get_gender(self, page) -> str:
-        return await self.loop.run_in_executor(None, self._get_gender, page)
-
-    async def get_birthday(self, page):
-        return await self.get_wikidata_date(page, "P569")
-
-    async def get_deathday(self, page):
-        return await self.get_wikidata_date(page, "P570")
-
-    async def get_wikidata_text_list(self, query: str, prop: str) -> str | None:
-        page = await self.genitive_search(query)
-        if not page:
-            return None
-        value = ", ".join(await self.get_wikidata_text(page, prop))
-        return value or None
-
-    async def get_field_of_work(self, page) -> str | None:
-        return await self.get_wikidata_text_list(page, "P101")
+    async def fetch_gender(self, page) -> str:
+        await self.load_item(page)
+        return await self.executors["entity"].run(self._get_gender, page)
 
     def _get_coords(self, page: pywikibot.Page) -> Tuple[float, float] | None:
         try:
-            item = pywikibot.ItemPage.fromPage(page)
+            item = self._get_item(page)
             for wb_item in item.claims["P625"]:
                 return wb_item.target.lat, wb_item.target.lon
         except (KeyError, IndexError, AttributeError):
             pass
 
-    async def get_coords(self, page: pywikibot.Page) -> Tuple[float, float] | None:
-        return await self.loop.run_in_executor(None, self._get_coords, page)
+    async def fetch_coords(self, page: pywikibot.Page) -> Tuple[float, float] | None:
+        await self.load_item(page)
+        return await self.executors["entity"].run(self._get_coords, page)
 
     def _get_wikidata_date(self, page, prop) -> str | None:
         try:
-            item = pywikibot.ItemPage.fromPage(page)
+            item = self._get_item(page)
             for wb_item in item.claims[prop]:
-                if "Q1985727" in wb_item.target.calendarmodel:
+                if GREGORIAN_CALENDAR in wb_item.target.calendarmodel:
                     return f"{wb_item.target.day} {MONTH_MAP[wb_item.target.month - 1]} {wb_item.target.year}"
         except (KeyError, IndexError):
             return None
 
     def _get_wikidata_text(self, page, prop) -> List[str]:
         items = []
-        item = pywikibot.ItemPage.fromPage(page)
+        item = self._get_item(page)
         logger.debug(f"{page} ({item})")
         for wb_item in item.claims.get(prop, []):
             try:
@@ -165,14 +674,16 @@ class WikiManager:
                 pass
         return items
 
-    async def get_wikidata_text(self, page, prop) -> List[str]:
-        return await self.loop.run_in_executor(None, self._get_wikidata_text, page, prop)
+    async def fetch_wikidata_text(self, page, prop) -> List[str]:
+        await self.load_item(page)
+        return await self.executors["entity"].run(self._get_wikidata_text, page, prop)
 
-    async def get_wikidata_date(self, page, prop) -> str | None:
-        return await self.loop.run_in_executor(None, self._get_wikidata_date, page, prop)
+    async def fetch_wikidata_date(self, page, prop) -> str | None:
+        await self.load_item(page)
+        return await self.executors["entity"].run(self._get_wikidata_date, page, prop)
 
     def _get_page_image_info(self, page: pywikibot.Page) -> Tuple[str | None, str | None, str | None]:
-        item = pywikibot.ItemPage.fromPage(page)
+        item = self._get_item(page)
         photo_bytes = None
         image_description = None
         category = None
@@ -190,33 +701,153 @@ class WikiManager:
             category = wb_category[0].target
         return photo_bytes, image_description, category
 
-    async def get_images_genitive(self, text: str) -> Tuple[str | None, str | None, str | None]:
-        page = await self.genitive_search(text)
-        if page is None:
-            return None, None, None
-        return await self.loop.run_in_executor(None, self._get_page_image_info, page)
+    async def get_page_image_info(self, page: pywikibot.Page) -> Tuple[str | None, str | None, str | None]:
+        await self.load_item(page)
+        return await self.executors["commons"].run(self._get_page_image_info, page)
 
-    async def genitive_transform(self, text: str) -> str:
-        word_list = text.split()
-        transformed_word_list = []
-        for word in word_list:
-            transformed_word = word
-            for w in reversed(self.morph.parse(word)):
-                if w.tag and w.tag.case == "gent":
-                    transformed_word = w.normal_form
-                    break
-            transformed_word_list.append(transformed_word.capitalize() if word.istitle() else transformed_word)
-        transformed_text = " ".join(transformed_word_list)
-        logger.debug(f"Transforming {text} to {transformed_text}")
-        return transformed_text
 
-    async def genitive_search(self, text: str) -> pywikibot.Page | None:
-        text = await self.genitive_transform(text)
-        page = await self.search_page(text)
-        if page:
-            return page
-        logger.info("Page not found on Wikipedia")
+class AsyncWikiManager(BaseWikiManager):
+    """Backend talking to the Action API and wbgetentities directly, without pywikibot and threads.
 
-    async def search(self, text: str) -> str | None:
-        page = await self.search_page(text)
-        return await self.get_page_summary(page)
+    Only read requests are made, so the OAuth login of the pywikibot backend is not needed.
+    """
+
+    def __init__(self, api: WikiApiClient | None = None):
+        super().__init__()
+        self.api = api or WikiApiClient()
+
+    def make_indexed_page(self, title: str, qid: str | None, extract: str | None) -> WikiPage:
+        return WikiPage(title, qid=qid, extract=extract)
+
+    async def fetch_search_page(self, query: str) -> WikiPage | None:
+        response = await self.api.wikipedia(
+            action="query", generator="search", gsrsearch=query, gsrlimit=1, gsrnamespace=0, **PAGE_PROPS
+        )
+        return make_page(next(iter(response.get("query", {}).get("pages", [])), None))
+
+    async def fetch_plain_text(self, page: WikiPage, fresh: bool = False) -> str | None:
+        response = await self.api.wikipedia(
+            action="query", prop="extracts", exsentences=7, explaintext=1, titles=page.title()
+        )
+        try:
+            return self.parse_text(next(iter(response["query"]["pages"]), None)["extract"])
+        except (KeyError, TypeError):
+            return None
+
+    async def get_random_page(self) -> WikiPage | None:
+        response = await self.api.wikipedia(
+            action="query",
+            generator="random",
+            grnlimit=1,
+            grnnamespace=0,
+            grnfilterredir="nonredirects",
+            **PAGE_PROPS,
+        )
+        return make_page(next(iter(response.get("query", {}).get("pages", [])), None))
+
+    async def fetch_random_pages(self, count: int) -> List[WikiPage]:
+        response = await self.api.wikipedia(
+            action="query",
+            generator="random",
+            grnlimit=count,
+            grnnamespace=0,
+            grnfilterredir="nonredirects",
+            **RANDOM_PROPS,
+        )
+        pages = response.get("query", {}).get("pages", [])
+        return [page for result in pages if (page := make_page(result)) is not None]
+
+    def _store_entity(self, page: WikiPage, entity: Dict[str, Any]) -> Dict[str, Any]:
+        if "missing" in entity or "id" not in entity:
+            return {}
+        page.qid = entity["id"]
+        claims = entity.get("claims", {})
+        self.entity_ids.set(page.title(), page.qid)
+        self.entities.set(page.qid, claims)
+        return claims
+
+    async def get_entity(self, page: WikiPage) -> Dict[str, Any]:
+        """Return the claims of the Wikidata item connected to the page, keyed by property."""
+        qid = page.qid or self.entity_ids.get(page.title(), None)
+        if qid and (claims := self.entities.get(qid)) is not MISSING:
+            return claims
+        with timed("wikidata"):
+            entity = await self.single_flight.do(("entity", qid or page.title()), partial(self.fetch_entity, qid, page))
+        return self._store_entity(page, entity)
+
+    async def fetch_entity(self, qid: str | None, page: WikiPage) -> Dict[str, Any]:
+        lookup = {"ids": qid} if qid else {"sites": "ukwiki", "titles": page.title()}
+        response = await self.api.wikidata(action="wbgetentities", props="claims", **lookup)
+        return next(iter(response.get("entities", {}).values()), {})
+
+    async def prefetch_entities(self, pages: List[WikiPage]) -> None:
+        """Load claims of all pages with a known QID in one wbgetentities request."""
+        missing = {page.qid: page for page in pages if page.qid and page.qid not in self.entities}
+        single = [page for page in pages if not page.qid]
+        if len(missing) == 1:
+            single.extend(missing.values())
+        await asyncio.gather(*(self.get_entity(page) for page in single))
+        if len(missing) < 2:
+            return
+        ids = "|".join(sorted(missing))
+        with timed("wikidata"):
+            response = await self.single_flight.do(
+                ("entities", ids), partial(self.api.wikidata, action="wbgetentities", props="claims", ids=ids)
+            )
+        for qid, entity in response.get("entities", {}).items():
+            if qid in missing:
+                self._store_entity(missing[qid], entity)
+
+    @staticmethod
+    def claim_values(claims: Dict[str, Any], prop: str) -> List[Any]:
+        values = []
+        for claim in claims.get(prop, []):
+            value = claim.get("mainsnak", {}).get("datavalue", {}).get("value")
+            if value is not None:
+                values.append(value)
+        return values
+
+    async def fetch_gender(self, page: WikiPage) -> str:
+        return gender_from_values(self.claim_values(await self.get_entity(page), "P21"))
+
+    async def fetch_coords(self, page: WikiPage) -> Tuple[float, float] | None:
+        return coords_from_values(self.claim_values(await self.get_entity(page), "P625"))
+
+    async def fetch_wikidata_date(self, page: WikiPage, prop) -> str | None:
+        return date_from_values(self.claim_values(await self.get_entity(page), prop))
+
+    async def fetch_wikidata_text(self, page: WikiPage, prop) -> List[str]:
+        values = self.claim_values(await self.get_entity(page), prop)
+        logger.debug(f"{page} ({page.qid})")
+        ids = item_ids(values)
+        labels = {}
+        if ids:
+            with timed("wikidata"):
+                response = await self.api.wikidata(
+                    action="wbgetentities", ids="|".join(ids), props="labels", languages="uk"
+                )
+            for qid, entity in response.get("entities", {}).items():
+                if label := entity.get("labels", {}).get("uk", {}).get("value"):
+                    labels[qid] = label
+        return texts_from_values(values, labels)
+
+    async def get_page_image_info(self, page: WikiPage) -> Tuple[str | None, str | None, str | None]:
+        claims = await self.get_entity(page)
+        image_url = None
+        image_description = None
+        images = self.claim_values(claims, "P18")
+        if images:
+            response = await self.api.commons(
+                action="query", titles=f"File:{images[0]}", prop="imageinfo", iiprop="url", iiurlwidth=800
+            )
+            info = next(iter(response["query"]["pages"]), {}).get("imageinfo", [{}])[0]
+            image_url = info.get("thumburl") or info.get("url")
+            image_description = info.get("descriptionurl")
+        categories = self.claim_values(claims, "P373")
+        return image_url, image_description, categories[0] if categories else None
+
+
+def create_wiki_manager(http_client: AsyncClient | None = None) -> BaseWikiManager:
+    if config.wiki_backend == "async":
+        return AsyncWikiManager(WikiApiClient(http_client))
+    return WikiManager()
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import time
+from typing import Any, Callable, List
+
+from telegram import Update
+from telegram.ext import Application, ContextTypes
+
+logger = logging.getLogger(__name__)
+
+
+class WorkersFailed(Exception):
+    """A worker kept exiting right after every restart."""
+
+
+def shard_of(update: Update, count: int) -> int:
+    """Updates of one chat always go to the same worker, inline queries by the user who sent them."""
+    if update.effective_chat is not None:
+        key = update.effective_chat.id
+    elif update.effective_user is not None:
+        key = update.effective_user.id
+    else:
+        key = update.update_id
+    return key % count
+
+
+class Router:
+    """Runs ``count`` worker processes and forwards every update to the one that owns its chat.
+
+    ``target(index, queue)`` is the entry point of a worker, it receives updates as JSON strings and
+    None when it should stop. A worker that exits on its own is started again on the same queue, so the
+    updates of its chats wait for it instead of going unanswered. Restarts in a row are spaced out twice as
+    long each time up to ``max_backoff`` seconds, a worker that stays up that long is healthy again. After
+    ``max_restarts`` restarts in a row (0 for no limit) the supervisor gives up with WorkersFailed.
+    """
+
+    def __init__(
+        self,
+        count: int,
+        target: Callable[[int, Any], None],
+        check_interval: float = 1,
+        max_restarts: int = 5,
+        max_backoff: float = 60,
+    ):
+        self.context = multiprocessing.get_context("spawn")
+        self.target = target
+        self.check_interval = check_interval
+        self.max_restarts = max_restarts
+        self.max_backoff = max_backoff
+        self.queues = [self.context.Queue() for _ in range(count)]
+        self.processes = [self._process(index) for index in range(count)]
+        self.routed: List[int] = [0] * count
+        self.restarts = 0
+        self.failures: List[int] = [0] * count
+        self.started: List[float] = [0.0] * count
+        self.restart_at: List[float | None] = [None] * count
+        self.supervisor: asyncio.Task | None = None
+
+    def _process(self, index: int):
+        return self.context.Process(
+            target=self.target, args=(index, self.queues[index]), name=f"ukwikibot-worker-{index}", daemon=True
+        )
+
+    def start(self) -> None:
+        for process in self.processes:
+            process.start()
+        self.started = [time.monotonic()] * len(self.processes)
+        self.supervisor = asyncio.ensure_future(self.supervise())
+        logger.info(f"Started {len(self.processes)} workers")
+
+    async def supervise(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            for index in range(len(self.processes)):
+                self._check(index, time.monotonic())
+
+    def _check(self, index: int, now: float) -> None:
+        process = self.processes[index]
+        if process.exitcode is None:
+            if now - self.started[index] >= self.max_backoff:
+                self.failures[index] = 0
+            return
+        if self.restart_at[index] is None:
+            self.failures[index] += 1
+            if self.max_restarts and self.failures[index] > self.max_restarts:
+                raise WorkersFailed(f"{process.name} exited {self.failures[index]} times in a row")
+            delay = min(self.check_interval * 2 ** (self.failures[index] - 1), self.max_backoff)
+            logger.error(f"{process.name} exited with code {process.exitcode}, restarting it in {delay:.1f}s")
+            self.restart_at[index] = now + delay
+        if now >= self.restart_at[index]:
+            self.restart_at[index] = None
+            self.restarts += 1
+            self.processes[index] = self._process(index)
+            self.processes[index].start()
+            self.started[index] = now
+
+    def check(self) -> None:
+        """Raise the error the supervisor gave up with."""
+        if self.supervisor is not None and self.supervisor.done() and not self.supervisor.cancelled():
+            self.supervisor.result()
+
+    async def route(self, update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
+        shard = shard_of(update, len(self.queues))
+        self.routed[shard] += 1
+        self.queues[shard].put(update.to_json())
+
+    async def stop(self, timeout: float) -> None:
+        if self.supervisor is not None:
+            self.supervisor.cancel()
+        for queue in self.queues:
+            queue.put(None)
+        loop = asyncio.get_running_loop()
+        for process in self.processes:
+            if process.pid is None:
+                continue
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                logger.warning(f"{process.name} did not stop in {timeout}s")
+                process.terminate()
+
+
+async def forward_updates(application: Application, queue: Any) -> None:
+    """Worker side: feed the updates routed to this worker into its application until told to stop."""
+    loop = asyncio.get_running_loop()
+    while (data := await loop.run_in_executor(None, queue.get)) is not None:
+        await application.update_queue.put(Update.de_json(json.loads(data), application.bot))